@@ -0,0 +1,79 @@
+"""
+Mesure le temps d'import de `main` (démarrage à froid de l'API) dans des
+processus Python neufs, et liste les modules les plus coûteux d'après
+`python -X importtime`. Avec --max-seconds, sort en erreur si la médiane
+dépasse le seuil (à lancer en CI pour suivre les régressions).
+
+    python benchmarks/bench_import_main.py --runs 5 --max-seconds 4
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Variables lues à l'import ; valeurs factices si absentes (aucune connexion n'est ouverte)
+IMPORT_ENV_DEFAULTS = {
+    "port": "3306",
+    "JWT_SECRET": "bench",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRE_HOURS": "24",
+    "SMTP_PORT": "587",
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    for key, value in IMPORT_ENV_DEFAULTS.items():
+        env.setdefault(key, value)
+    return env
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def top_imports(env: dict, count: int) -> list:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env,
+                            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self_us | cumulative_us | <indentation>module"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name[1:].rstrip()))
+    # Imports directs de main et de l'interpréteur (indentés d'un niveau)
+    direct = [(us, name.strip()) for us, name in rows if len(name) - len(name.lstrip()) == 2]
+    return sorted(direct, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    env = _env()
+    timings = [time_import(env) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import main : médiane {median:.2f} s, min {min(timings):.2f} s, max {max(timings):.2f} s ({args.runs} runs)")
+
+    print("\nImports directs les plus coûteux (cumulé) :")
+    for cumulative_us, name in top_imports(env, args.top):
+        print(f"  {cumulative_us / 1e6:6.2f} s  {name}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"\nRÉGRESSION : {median:.2f} s > {args.max_seconds:.2f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Débit de prédiction (offres/s) selon le backend d'inférence : dans le
+processus (threads, INFERENCE_BACKEND=thread) puis pool de 1..--max-workers
+processus (INFERENCE_BACKEND=process). Des threads clients envoient en continu
+des lots de --batch offres, comme le font les handlers après regroupement.
+
+    python benchmarks/bench_inference_pool.py --seconds 5 --clients 16 --max-workers 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services import inference_pool, prediction_service
+
+WORDS = ("python java docker aws sql senior junior développeur data scientist kubernetes react "
+         "machine learning chef projet équipe expérience ans cloud agile").split()
+
+
+def postings(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        {"titre": " ".join(rng.choices(WORDS, k=3)), "description": " ".join(rng.choices(WORDS, k=rng.randint(40, 160))),
+         "region": rng.choice(["Île-de-France", "Bretagne", "Occitanie"])}
+        for _ in range(count)
+    ]
+
+
+def throughput(seconds: float, clients: int, batch: int) -> float:
+    deadline = time.perf_counter() + seconds
+
+    def client(seed):
+        items = postings(batch, seed)
+        done = 0
+        while time.perf_counter() < deadline:
+            prediction_service.predict_salaries(items, use_cache=False)
+            done += len(items)
+        return done
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(client, range(clients)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    prediction_service.warm_up_model()
+    print(f"{os.cpu_count()} cœurs, {args.clients} clients, lots de {args.batch} offres")
+
+    inference_pool.INFERENCE_BACKEND = "thread"
+    print(f"  thread (dans le processus)  {throughput(args.seconds, args.clients, args.batch):10.0f} offres/s")
+
+    inference_pool.INFERENCE_BACKEND = "process"
+    for workers in range(1, args.max_workers + 1):
+        pool = inference_pool.InferencePool(workers=workers, max_pending=workers * 4)
+        inference_pool._pool = pool
+        pool.start()
+        rate = throughput(args.seconds, args.clients, args.batch)
+        stats = pool.get_stats()
+        pool.stop()
+        print(f"  process, {workers:>2} workers        {rate:10.0f} offres/s "
+              f"(saturé {stats['saturated']} lots, repli dans le processus)")
+
+
+if __name__ == "__main__":
+    main()
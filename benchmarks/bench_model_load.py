@@ -0,0 +1,69 @@
+"""
+Temps de chargement et mémoire par worker du modèle, pickle contre export
+(scripts/export_model.py). Chaque mesure tourne dans un processus Python
+neuf qui importe prediction_service, charge le modèle et fait une prédiction.
+
+RSS compte aussi les pages partagées (tableaux en mmap, bibliothèques) ;
+"privé" est ce que chaque worker supplémentaire coûte réellement (Linux).
+
+    python benchmarks/bench_model_load.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CHILD = r"""
+import json, time
+start = time.perf_counter()
+from services import prediction_service
+model, version, path = prediction_service._load_from_disk()
+loaded = time.perf_counter()
+prediction_service._warm_up(model)
+ready = time.perf_counter()
+
+def memory():
+    rss = private = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        kb = lambda name: int(fields[name].split()[0])
+        rss = kb("Rss") / 1024
+        private = (kb("Private_Clean") + kb("Private_Dirty")) / 1024
+    except (OSError, KeyError):
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return rss, private
+
+rss, private = memory()
+print(json.dumps({"type": type(model).__name__, "load_s": loaded - start, "ready_s": ready - start,
+                  "rss_mb": rss, "private_mb": private}))
+"""
+
+
+def measure(model_format: str) -> dict:
+    env = dict(os.environ, MODEL_FORMAT=model_format)
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", CHILD], cwd=ROOT, env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for model_format in ("pickle", "exported"):
+        runs = [measure(model_format) for _ in range(args.runs)]
+        median = lambda key: statistics.median(run[key] for run in runs)
+        private = f"{median('private_mb'):6.0f} Mo privés" if runs[0]["private_mb"] is not None else ""
+        print(f"{model_format:<9} ({runs[0]['type']}) : import+chargement {median('load_s'):.2f} s, "
+              f"prêt {median('ready_s'):.2f} s, RSS {median('rss_mb'):.0f} Mo {private}")
+
+
+if __name__ == "__main__":
+    main()
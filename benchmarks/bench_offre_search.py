@@ -0,0 +1,152 @@
+"""
+Benchmark de search_offres sur une table Offre synthétique (1M lignes par
+défaut), avant et après migrations/001_offre_search_indexes.sql : mot-clé en
+LIKE '%kw%' puis en MATCH ... AGAINST, filtres par libellé puis par identifiant.
+
+Utilise les variables de connexion habituelles (host, port, user...) mais
+crée ses tables dans une base dédiée (BENCH_DATABASE, "salary_bench" par défaut).
+
+    python benchmarks/bench_offre_search.py --rows 1000000
+    python benchmarks/bench_offre_search.py --skip-load   # tables déjà remplies
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+BENCH_DATABASE = os.getenv("BENCH_DATABASE", "salary_bench")
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+_admin_config = {
+    "host": os.getenv("host"),
+    "port": int(os.getenv("port")),
+    "user": os.getenv("user"),
+    "password": os.getenv("password"),
+}
+# La base de benchmark doit exister avant que database.py ne crée son pool
+_conn = mysql.connector.connect(**_admin_config)
+_conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{BENCH_DATABASE}`")
+_conn.close()
+os.environ["database"] = BENCH_DATABASE
+
+from database import Database
+from services import search_service
+from migrations.migrate import _statements
+
+SCHEMA = [
+    "DROP TABLE IF EXISTS Offre, Salaire, Departement, Region, Experience, Metiers",
+    "CREATE TABLE Metiers (idMetier INT PRIMARY KEY, libelle VARCHAR(255))",
+    "CREATE TABLE Experience (idExperience INT PRIMARY KEY, libelle VARCHAR(255))",
+    "CREATE TABLE Region (idRegion INT PRIMARY KEY, region VARCHAR(255))",
+    "CREATE TABLE Departement (idDepartement INT PRIMARY KEY, departement VARCHAR(255), idRegion INT)",
+    """CREATE TABLE Salaire (idsalaire INT PRIMARY KEY, salaire_min DECIMAL(10,2),
+           salaire_max DECIMAL(10,2), salaire_avg DECIMAL(10,2))""",
+    """CREATE TABLE Offre (idOffre INT PRIMARY KEY, titre VARCHAR(255), description TEXT,
+           idMetier INT, idExperience INT, idDepartement INT, idsalaire INT)""",
+]
+
+METIERS = ["Développeur", "Data Scientist", "Chef de projet", "DevOps", "Comptable", "Commercial",
+           "Infirmier", "Technicien", "Ingénieur", "Designer", "Juriste", "Acheteur"]
+EXPERIENCES = ["Junior (0-2 ans)", "Intermédiaire (2-5 ans)", "Senior (5+ ans)"]
+REGIONS = ["Île-de-France", "Auvergne-Rhône-Alpes", "Occitanie", "Nouvelle-Aquitaine", "Bretagne",
+           "Hauts-de-France", "Grand Est", "Normandie", "Pays de la Loire", "Bourgogne-Franche-Comté",
+           "Centre-Val de Loire", "Provence-Alpes-Côte d'Azur", "Corse"]
+WORDS = ("python java javascript sql react docker kubernetes aws azure agile scrum équipe projet "
+         "client produit données analyse gestion développement conception maintenance qualité "
+         "sécurité réseau cloud mobile web backend frontend fullstack télétravail mutuelle "
+         "entreprise croissance innovation formation autonomie rigueur communication").split()
+
+
+def load(rows: int, chunk: int = 10_000):
+    rng = random.Random(0)
+    for statement in SCHEMA:
+        Database.execute(statement)
+    Database.execute_many("INSERT INTO Metiers VALUES (%s, %s)", list(enumerate(METIERS, 1)))
+    Database.execute_many("INSERT INTO Experience VALUES (%s, %s)", list(enumerate(EXPERIENCES, 1)))
+    Database.execute_many("INSERT INTO Region VALUES (%s, %s)", list(enumerate(REGIONS, 1)))
+    Database.execute_many(
+        "INSERT INTO Departement VALUES (%s, %s, %s)",
+        [(i, f"Département {i}", rng.randint(1, len(REGIONS))) for i in range(1, 101)]
+    )
+
+    start = time.perf_counter()
+    for first in range(1, rows + 1, chunk):
+        ids = range(first, min(first + chunk, rows + 1))
+        salaires = []
+        offres = []
+        for i in ids:
+            avg = rng.randint(25_000, 90_000)
+            salaires.append((i, avg * 0.9, avg * 1.1, avg))
+            titre = f"{rng.choice(METIERS)} {rng.choice(WORDS)}"
+            description = " ".join(rng.choices(WORDS, k=rng.randint(60, 120)))
+            offres.append((i, titre, description, rng.randint(1, len(METIERS)),
+                           rng.randint(1, len(EXPERIENCES)), rng.randint(1, 100), i))
+        Database.execute_many("INSERT INTO Salaire VALUES (%s, %s, %s, %s)", salaires)
+        Database.execute_many("INSERT INTO Offre VALUES (%s, %s, %s, %s, %s, %s, %s)", offres)
+        print(f"\r  {ids[-1]:>9} / {rows} offres", end="", flush=True)
+    print(f"\n  chargé en {time.perf_counter() - start:.0f} s")
+    # Schéma courant : salaire_avg recopié sur Offre (lu par search_offres)
+    apply_migration("002_offre_keyset_pagination.sql")
+    apply_migration("008_offre_salaire_avg.sql")
+
+
+def timed(label: str, repeat: int = 3, **kwargs):
+    best = float("inf")
+    total = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = search_service.search_offres(**kwargs)
+        best = min(best, time.perf_counter() - start)
+        total = result["total"]
+    print(f"  {label:<42} {best * 1000:10.1f} ms   total={total}")
+
+
+def run_queries(fulltext: bool):
+    search_service.SEARCH_FULLTEXT = "1" if fulltext else "0"
+    mode = "MATCH" if fulltext else "LIKE"
+    timed(f"keyword 'kubernetes' ({mode})", keyword="kubernetes")
+    timed(f"keyword 'python sécurité' ({mode})", keyword="python sécurité")
+    timed("metier LIKE + region LIKE", metier="Data", region="Bretagne")
+    timed("metier_id + region_id + experience_id", metier_id=2, region_id=5, experience_id=3)
+
+
+def apply_migration(name: str):
+    path = os.path.join(ROOT, "migrations", name)
+    with open(path, encoding="utf-8") as f:
+        statements = _statements(f.read())
+    start = time.perf_counter()
+    for statement in statements:
+        Database.execute(statement)
+    print(f"  {name} appliquée en {time.perf_counter() - start:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-load", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        print(f"Chargement de {args.rows} offres dans {BENCH_DATABASE}...")
+        load(args.rows)
+
+        print("\nSans index :")
+        run_queries(fulltext=False)
+
+        print("\nMigration 001 :")
+        apply_migration("001_offre_search_indexes.sql")
+
+    print("\nAvec index :")
+    run_queries(fulltext=False)
+    run_queries(fulltext=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Débit de vérification des mots de passe (logins/s) au coût scrypt configuré
+(PASSWORD_SCRYPT_N / _R / _P), sur un thread puis via le pool dédié avec
+1..--max-workers threads, comparé à l'ancien SHA-256. Aucune base requise.
+
+    python benchmarks/bench_password_hash.py --seconds 3 --max-workers 4
+    PASSWORD_SCRYPT_N=65536 python benchmarks/bench_password_hash.py
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services import password_hasher
+from services.password_hasher import PasswordHasher, hash_password_sync, verify_password_sync
+import hashlib
+
+PASSWORD = "correct horse battery staple"
+
+
+def rate(fn, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def pool_rate(workers: int, hashed: str, seconds: float) -> float:
+    hasher = PasswordHasher(workers=workers, max_pending=10_000)
+    # Autant de clients que de threads du pool : le pool est toujours occupé
+    clients = workers * 2
+    deadline = time.perf_counter() + seconds
+
+    def client(_):
+        done = 0
+        while time.perf_counter() < deadline:
+            hasher.verify(PASSWORD, hashed)
+            done += 1
+        return done
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(client, range(clients)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"scrypt N={password_hasher.PASSWORD_SCRYPT_N} r={password_hasher.PASSWORD_SCRYPT_R} "
+          f"p={password_hasher.PASSWORD_SCRYPT_P}, {os.cpu_count()} cœurs")
+
+    legacy = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    hashed = hash_password_sync(PASSWORD)
+    assert verify_password_sync(PASSWORD, hashed) and verify_password_sync(PASSWORD, legacy)
+
+    single = rate(lambda: verify_password_sync(PASSWORD, hashed), args.seconds)
+    print(f"  sha256 (ancien)          {rate(lambda: verify_password_sync(PASSWORD, legacy), args.seconds):12.0f} logins/s")
+    print(f"  scrypt, 1 thread         {single:12.1f} logins/s ({1000 / single:.0f} ms/login)")
+
+    for workers in range(1, args.max_workers + 1):
+        throughput = pool_rate(workers, hashed, args.seconds)
+        cores = min(workers, os.cpu_count() or 1)
+        print(f"  scrypt, pool {workers:>2} threads {throughput:12.1f} logins/s ({throughput / cores:.1f} /s/cœur)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Latence d'une prédiction unitaire : chemin DataFrame (model.predict sur un
+pd.DataFrame d'une ligne) contre chemin direct (_model_predict : TF-IDF,
+one-hot et inplace_predict sans pandas), pour le pickle et pour l'export
+(scripts/export_model.py). Vérifie que les sorties sont identiques.
+
+    python benchmarks/bench_single_prediction.py --calls 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+warnings.filterwarnings("ignore")
+
+import pandas as pd
+from services import prediction_service
+from services.model_format import ExportedSalaryModel
+
+WORDS = ("python java docker aws sql senior junior développeur data scientist kubernetes react "
+         "machine learning chef projet équipe expérience ans cloud agile").split()
+REGIONS = ["Île-de-France", "Bretagne", "Occitanie", ""]
+
+
+def postings(count: int) -> list:
+    rng = random.Random(0)
+    rows = []
+    for _ in range(count):
+        titre = " ".join(rng.choices(WORDS, k=3))
+        description = " ".join(rng.choices(WORDS, k=rng.randint(20, 120)))
+        rows.append(prediction_service._build_features(
+            titre, description, "", rng.choice(REGIONS),
+            prediction_service.get_experience_level(description),
+            prediction_service.extract_competences_from_text(description)
+        ))
+    return rows
+
+
+def latencies(fn, rows: list) -> list:
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"  {label:<12} p50 {statistics.median(timings):8.0f} µs   p99 {p99:8.0f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    model_path = prediction_service._get_model_path()
+    with open(model_path, "rb") as f:
+        pipeline = prediction_service._load_pickle(model_path, f.read())[0]
+    models = [("pickle", pipeline)]
+    export_dir = prediction_service._get_export_dir(model_path)
+    if export_dir:
+        models.append(("export", ExportedSalaryModel(export_dir)))
+
+    rows = postings(args.calls)
+    for name, model in models:
+        dataframe = lambda row: float(model.predict(pd.DataFrame([row]))[0])
+        lean = lambda row: prediction_service._model_predict(model, [row])[0]
+        # Chauffe, puis contrôle d'égalité sur toutes les lignes
+        dataframe(rows[0]), lean(rows[0])
+        mismatches = sum(dataframe(row) != lean(row) for row in rows)
+
+        print(f"{name} ({args.calls} appels, {mismatches} écarts) :")
+        report("DataFrame", latencies(dataframe, rows))
+        report("direct", latencies(lean, rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Compare l'extraction compétences + niveau d'expérience actuelle (table de
+termes précompilée, bornes de mots) à l'ancienne implémentation par
+sous-chaînes, sur des descriptions d'offres réalistes de 5 à 20 Ko, avec la
+liste intégrée puis avec un vocabulaire étendu comme celui de la table
+Competence (regex trie en un seul passage).
+
+    python benchmarks/bench_text_matcher.py
+"""
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.prediction_service import KNOWN_COMPETENCES, EXPERIENCE_TERMS, _TextMatcher, analyze_posting
+
+EXTRA_COMPETENCES = [
+    "kafka", "spark", "hadoop", "airflow", "terraform", "ansible", "jenkins", "gitlab ci",
+    "power bi", "tableau", "excel", "sap", "salesforce", "jira", "figma", "kotlin", "swift",
+    "flutter", "graphql", "rabbitmq", "elasticsearch", "snowflake", "dbt", "pandas", "numpy",
+    "scikit-learn", "keras", "opencv", "nlp", "llm", "matlab", "c#", ".net", "laravel",
+    "symfony", "wordpress", "magento", "shopify", "sass", "webpack", "vite", "next.js",
+    "nuxt", "svelte", "jquery", "bootstrap", "tailwind", "selenium", "cypress", "jest",
+    "pytest", "junit", "sonarqube", "prometheus", "grafana", "datadog", "openshift", "helm",
+    "istio", "nginx", "apache", "tomcat", "oracle", "sql server", "mariadb", "cassandra",
+    "neo4j", "bigquery", "redshift", "databricks", "looker", "qlik", "talend", "informatica",
+    "sas", "spss", "stata", "cobol", "fortran", "perl", "bash", "powershell", "vba",
+    "itil", "prince2", "safe", "kanban", "lean", "six sigma", "cybersécurité", "iso 27001",
+]
+
+SENTENCES = [
+    "Au sein d'une équipe produit de 8 personnes, vous participerez à la conception de nos services.",
+    "Vous développerez des APIs en Python avec FastAPI et Django, déployées sur AWS via Docker et Kubernetes.",
+    "Notre stack front repose sur React, TypeScript et une touche de Vue pour les outils internes.",
+    "Les données sont stockées dans PostgreSQL, MongoDB et Redis ; une connaissance de SQL est indispensable.",
+    "Vous travaillerez en méthode Agile (Scrum) avec des sprints de deux semaines et une culture DevOps.",
+    "Une expérience en machine learning ou deep learning (TensorFlow, PyTorch) serait un plus apprécié.",
+    "Nous recherchons un profil intermédiaire avec 3 ans d'expérience minimum sur un poste similaire.",
+    "Le poste est basé à Lyon avec deux jours de télétravail par semaine et une mutuelle prise en charge.",
+    "Rejoignez une entreprise engagée, partenaire de Google Cloud et reconnue pour sa politique RSE.",
+    "Vous serez accompagné par un lead technique et participerez aux revues de code sur GitLab.",
+    "Avantages : tickets restaurant, RTT, prime de participation, plan d'épargne entreprise.",
+    "La maîtrise de Linux, Git et des bonnes pratiques de tests automatisés est attendue.",
+]
+
+
+def _legacy_extract(text: str) -> List[str]:
+    known = [
+        'python', 'java', 'javascript', 'sql', 'react', 'angular', 'vue',
+        'node.js', 'docker', 'kubernetes', 'aws', 'azure', 'gcp',
+        'machine learning', 'deep learning', 'tensorflow', 'pytorch',
+        'git', 'linux', 'agile', 'scrum', 'devops',
+        'mongodb', 'postgresql', 'mysql', 'redis',
+        'typescript', 'c++', 'go', 'rust', 'scala',
+        'fastapi', 'django', 'flask', 'spring', 'php', 'html', 'css'
+    ]
+    text_lower = text.lower()
+    return [c for c in known if c in text_lower]
+
+
+def _legacy_level(text: str) -> Optional[str]:
+    text_lower = text.lower()
+    if any(t in text_lower for t in ['senior', '5 ans', '10 ans', 'expert', 'lead']):
+        return "Senior (5+ ans)"
+    elif any(t in text_lower for t in ['junior', 'débutant', '0-2 ans']):
+        return "Junior (0-2 ans)"
+    elif any(t in text_lower for t in ['intermédiaire', '2-5 ans', '3 ans']):
+        return "Intermédiaire (2-5 ans)"
+    return None
+
+
+def make_descriptions(count: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    descriptions = []
+    for _ in range(count):
+        target = rng.randint(5_000, 20_000)
+        parts = []
+        size = 0
+        while size < target:
+            sentence = rng.choice(SENTENCES)
+            parts.append(sentence)
+            size += len(sentence) + 1
+        descriptions.append(" ".join(parts))
+    return descriptions
+
+
+def bench(label: str, fn, titre: str, descriptions: List[str], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for description in descriptions:
+            fn(titre, description)
+        best = min(best, time.perf_counter() - start)
+    per_call = best / len(descriptions) * 1e6
+    print(f"{label:<10} {per_call:10.1f} µs/offre")
+    return per_call
+
+
+def legacy(titre: str, description: str):
+    return _legacy_extract(f"{titre} {description}"), _legacy_level(description)
+
+
+def legacy_extended(titre: str, description: str):
+    # Même approche par sous-chaînes, appliquée au vocabulaire étendu
+    text_lower = f"{titre} {description}".lower()
+    return [c for c in KNOWN_COMPETENCES + EXTRA_COMPETENCES if c in text_lower], _legacy_level(description)
+
+
+def compiled_extended(matcher: _TextMatcher):
+    def run(titre: str, description: str):
+        competences, level = matcher.scan(description)
+        competences |= matcher.scan(titre, with_level=False)[0]
+        return matcher.sorted_competences(competences), level
+    return run
+
+
+def main():
+    titre = "Développeur Python / Data Engineer"
+    descriptions = make_descriptions(200)
+    avg_kb = sum(len(d) for d in descriptions) / len(descriptions) / 1024
+    print(f"{len(descriptions)} descriptions, {avg_kb:.1f} Ko en moyenne")
+
+    level_terms = sum(len(words) for _, words in EXPERIENCE_TERMS)
+    print(f"\n-- liste intégrée ({len(KNOWN_COMPETENCES)} compétences + {level_terms} termes de niveau)")
+    old = bench("legacy", legacy, titre, descriptions)
+    new = bench("compiled", analyze_posting, titre, descriptions)
+    print(f"speedup x{old / new:.2f}")
+
+    extended = _TextMatcher(KNOWN_COMPETENCES + EXTRA_COMPETENCES)
+    print(f"\n-- vocabulaire étendu ({len(extended.competences)} compétences)")
+    old = bench("legacy", legacy_extended, titre, descriptions)
+    new = bench("compiled", compiled_extended(extended), titre, descriptions)
+    print(f"speedup x{old / new:.2f}")
+
+    sample = descriptions[0]
+    print("\nlegacy  :", legacy(titre, sample))
+    print("compiled:", analyze_posting(titre, sample))
+
+
+if __name__ == "__main__":
+    main()
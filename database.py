@@ -1,7 +1,17 @@
 from mysql.connector import pooling
-from contextlib import contextmanager
+from mysql.connector.errors import PoolError
+from contextlib import contextmanager, asynccontextmanager
+import asyncio
 import os
+import random
+import re
+import ssl
+import threading
+import time
 from dotenv import load_dotenv
+from services.log import get_logger
+from services.metrics import registry
+from services.request_timing import record_timing
 load_dotenv()
 
 DB_CONFIG = {
@@ -16,46 +26,336 @@ DB_CONFIG = {
     "ssl_verify_cert":bool(os.getenv("ssl_verify_cert"))
 } #charger configuration de la database
 
+# Taille des pools (mysql-connector plafonne à 32) et attente maximale d'une connexion libre
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Requêtes plus lentes que ce seuil journalisées (paramètres masqués) ; 0 : désactivé
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Part des requêtes lentes (SELECT) suivies d'un EXPLAIN journalisé ; 0 : jamais
+DB_EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", "0"))
+
+logger = get_logger("db")
+
+QUERY_SECONDS = registry.histogram("predisalaire_db_query_seconds", "Exécution d'une requête SQL (hors attente du pool)",
+                                   ("pool", "op"))
+SLOW_QUERIES = registry.counter("predisalaire_db_slow_queries_total", "Requêtes au-delà de DB_SLOW_QUERY_MS", ("pool", "op"))
+
+
+def _redact(params) -> str:
+    # Jamais les valeurs (emails, mots de passe hachés, codes OTP) : seulement leur type
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+def _compact(query: str, limit: int = 500) -> str:
+    query = re.sub(r"\s+", " ", query).strip()
+    return query if len(query) <= limit else query[:limit] + "..."
+
+
+class _QueryLog:
+    """Durée des requêtes : histogramme, Server-Timing de la requête HTTP en cours et journal des requêtes lentes."""
+
+    def __init__(self, pool: str):
+        self.pool = pool
+
+    def observe(self, op: str, query: str, params, seconds: float) -> bool:
+        """Renvoie True si la requête est lente et doit être suivie d'un EXPLAIN."""
+        QUERY_SECONDS.labels(pool=self.pool, op=op).observe(seconds)
+        record_timing(f"db_{op}", seconds)
+        if not DB_SLOW_QUERY_MS or seconds * 1000 < DB_SLOW_QUERY_MS:
+            return False
+        SLOW_QUERIES.labels(pool=self.pool, op=op).inc()
+        logger.warning("slow_query", pool=self.pool, op=op, ms=round(seconds * 1000, 1),
+                       query=_compact(query), params=_redact(params))
+        return (DB_EXPLAIN_SAMPLE_RATE > 0 and query.lstrip()[:6].upper() in ("SELECT", "WITH")
+                and random.random() < DB_EXPLAIN_SAMPLE_RATE)
+
+    def explain(self, query: str, plan: list):
+        logger.warning("slow_query_plan", pool=self.pool, query=_compact(query, 120), plan=plan)
+
+
+class _PoolStats:
+    """Compteurs d'un pool : connexions utilisées, attentes et latence d'acquisition."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def start_wait(self):
+        with self._lock:
+            self.waiters += 1
+
+    def end_wait(self, started: float, acquired: bool):
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.waiters -= 1
+            if acquired:
+                self.in_use += 1
+                self.acquired += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            else:
+                self.timeouts += 1
+
+    def released(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "waiters": self.waiters,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "acquire_avg_ms": round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0,
+                "acquire_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
 class Database:
     _pool = None
+    _slots = None
+    _pool_lock = threading.Lock()
+    stats = _PoolStats(DB_POOL_SIZE)
+    queries = _QueryLog("sync")
     
     @classmethod
     def get_pool(cls):
         if cls._pool is None:
-            cls._pool = pooling.MySQLConnectionPool(
-                pool_name="salary_pool",
-                pool_size=5,
-                pool_reset_session=True,
-                **DB_CONFIG
-            )
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+                    cls._pool = pooling.MySQLConnectionPool(
+                        pool_name="salary_pool",
+                        pool_size=DB_POOL_SIZE,
+                        pool_reset_session=True,
+                        **DB_CONFIG
+                    )
         return cls._pool
     
+    @classmethod
+    def _acquire(cls):
+        # Le pool mysql-connector lève PoolError dès qu'il est vide : on fait
+        # patienter l'appelant sur un sémaphore jusqu'à DB_POOL_TIMEOUT
+        pool = cls.get_pool()
+        started = time.perf_counter()
+        cls.stats.start_wait()
+        acquired = cls._slots.acquire(timeout=DB_POOL_TIMEOUT)
+        if acquired:
+            try:
+                conn = pool.get_connection()
+            except Exception:
+                cls._slots.release()
+                cls.stats.end_wait(started, False)
+                raise
+        cls.stats.end_wait(started, acquired)
+        record_timing("db_wait", time.perf_counter() - started)
+        if not acquired:
+            raise PoolError(f"No database connection available after {DB_POOL_TIMEOUT}s")
+        return conn
+    
+    @classmethod
+    def _release(cls, conn):
+        try:
+            conn.close()
+        finally:
+            cls.stats.released()
+            cls._slots.release()
+    
     @classmethod
     @contextmanager
     def get_cursor(cls):
-        conn = cls.get_pool().get_connection()
-        cursor = conn.cursor(dictionary=True, buffered=True)
+        conn = cls._acquire()
         try:
-            yield cursor, conn
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            try:
+                yield cursor, conn
+            finally:
+                cursor.close()
         finally:
-            cursor.close()
-            conn.close()
+            cls._release(conn)
+    
+    @classmethod
+    def _run(cls, cursor, conn, op: str, query: str, params):
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        if cls.queries.observe(op, query, params, time.perf_counter() - started):
+            # Curseur bufferisé : le résultat est déjà lu, la connexion est libre
+            try:
+                plan_cursor = conn.cursor(dictionary=True, buffered=True)
+                try:
+                    plan_cursor.execute("EXPLAIN " + query, params)
+                    cls.queries.explain(query, plan_cursor.fetchall())
+                finally:
+                    plan_cursor.close()
+            except Exception as e:
+                logger.debug("explain_failed", error=e)
     
     @classmethod
     def execute(cls, query: str, params: tuple = None) -> int:
         with cls.get_cursor() as (cursor, conn):
-            cursor.execute(query, params)
+            cls._run(cursor, conn, "execute", query, params)
             conn.commit()
             return cursor.lastrowid
     
+    @classmethod
+    def execute_rowcount(cls, query: str, params: tuple = None) -> int:
+        """Comme execute, mais renvoie le nombre de lignes modifiées."""
+        with cls.get_cursor() as (cursor, conn):
+            cls._run(cursor, conn, "execute", query, params)
+            conn.commit()
+            return cursor.rowcount
+    
+    @classmethod
+    def execute_fetch_one(cls, query: str, params: tuple, select: str, select_params: tuple = None) -> dict:
+        """Écriture puis lecture d'une ligne dans une seule transaction (verrous gardés jusqu'au commit)."""
+        with cls.get_cursor() as (cursor, conn):
+            cls._run(cursor, conn, "execute", query, params)
+            cls._run(cursor, conn, "fetch_one", select, select_params)
+            row = cursor.fetchone()
+            conn.commit()
+            return row
+    
     @classmethod
     def fetch_one(cls, query: str, params: tuple = None) -> dict:
-        with cls.get_cursor() as (cursor, _):
-            cursor.execute(query, params)
+        with cls.get_cursor() as (cursor, conn):
+            cls._run(cursor, conn, "fetch_one", query, params)
             return cursor.fetchone()
     
     @classmethod
     def fetch_all(cls, query: str, params: tuple = None) -> list:
-        with cls.get_cursor() as (cursor, _):
-            cursor.execute(query, params)
-            return cursor.fetchall()
\ No newline at end of file
+        with cls.get_cursor() as (cursor, conn):
+            cls._run(cursor, conn, "fetch_all", query, params)
+            return cursor.fetchall()
+    
+    @classmethod
+    def execute_many(cls, query: str, params_seq: list) -> int:
+        # mysql-connector réécrit un INSERT ... VALUES en un seul INSERT multi-lignes
+        with cls.get_cursor() as (cursor, conn):
+            started = time.perf_counter()
+            cursor.executemany(query, params_seq)
+            cls.queries.observe("execute_many", query, params_seq[0] if params_seq else None,
+                                time.perf_counter() - started)
+            conn.commit()
+            return cursor.rowcount
+
+
+
+def _async_ssl_context():
+    if DB_CONFIG["ssl_disabled"]:
+        return None
+    context = ssl.create_default_context()
+    if not DB_CONFIG["ssl_verify_cert"]:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class AsyncDatabase:
+    """
+    Même API que Database en coroutines (aiomysql), pour les routes async :
+    la boucle d'événements n'est pas bloquée pendant les I/O.
+    """
+    _pool = None
+    _pool_lock = None
+    stats = _PoolStats(DB_ASYNC_POOL_SIZE)
+    queries = _QueryLog("async")
+    
+    @classmethod
+    async def get_pool(cls):
+        if cls._pool is None:
+            if cls._pool_lock is None:
+                cls._pool_lock = asyncio.Lock()
+            async with cls._pool_lock:
+                if cls._pool is None:
+                    import aiomysql
+                    cls._pool = await aiomysql.create_pool(
+                        minsize=1,
+                        maxsize=DB_ASYNC_POOL_SIZE,
+                        host=DB_CONFIG["host"],
+                        port=DB_CONFIG["port"],
+                        user=DB_CONFIG["user"],
+                        password=DB_CONFIG["password"],
+                        db=DB_CONFIG["database"],
+                        charset=DB_CONFIG["charset"] or "utf8mb4",
+                        ssl=_async_ssl_context(),
+                        # Sans autocommit, un SELECT laisse une transaction ouverte et
+                        # pool.release() ferme la connexion au lieu de la réutiliser
+                        autocommit=True,
+                    )
+        return cls._pool
+    
+    @classmethod
+    @asynccontextmanager
+    async def get_cursor(cls):
+        import aiomysql
+        pool = await cls.get_pool()
+        started = time.perf_counter()
+        cls.stats.start_wait()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            cls.stats.end_wait(started, False)
+            raise PoolError(f"No database connection available after {DB_POOL_TIMEOUT}s")
+        except BaseException:
+            cls.stats.end_wait(started, False)
+            raise
+        cls.stats.end_wait(started, True)
+        record_timing("db_wait", time.perf_counter() - started)
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                yield cursor, conn
+        finally:
+            pool.release(conn)
+            cls.stats.released()
+    
+    @classmethod
+    async def _run(cls, cursor, conn, op: str, query: str, params):
+        started = time.perf_counter()
+        await cursor.execute(query, params)
+        if cls.queries.observe(op, query, params, time.perf_counter() - started):
+            import aiomysql
+            try:
+                async with conn.cursor(aiomysql.DictCursor) as plan_cursor:
+                    await plan_cursor.execute("EXPLAIN " + query, params)
+                    cls.queries.explain(query, await plan_cursor.fetchall())
+            except Exception as e:
+                logger.debug("explain_failed", error=e)
+    
+    @classmethod
+    async def execute(cls, query: str, params: tuple = None) -> int:
+        async with cls.get_cursor() as (cursor, conn):
+            await cls._run(cursor, conn, "execute", query, params)
+            await conn.commit()
+            return cursor.lastrowid
+    
+    @classmethod
+    async def fetch_one(cls, query: str, params: tuple = None) -> dict:
+        async with cls.get_cursor() as (cursor, conn):
+            await cls._run(cursor, conn, "fetch_one", query, params)
+            return await cursor.fetchone()
+    
+    @classmethod
+    async def fetch_all(cls, query: str, params: tuple = None) -> list:
+        async with cls.get_cursor() as (cursor, conn):
+            await cls._run(cursor, conn, "fetch_all", query, params)
+            return await cursor.fetchall()
+    
+    @classmethod
+    async def close(cls):
+        if cls._pool is not None:
+            cls._pool.close()
+            await cls._pool.wait_closed()
+            cls._pool = None
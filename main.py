@@ -1,13 +1,104 @@
-from fastapi import FastAPI
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routes.auth_routes import router as auth_router
 from routes.search_routes import router as search_router
 from routes.prediction_routes import router as prediction_router
+from routes.market_routes import router as market_router
+from routes.feedback import feedback_buffer, warm_sheet_client
+from services.auth_service import require_admin
+from services.prediction_service import (
+    warm_up_model, reload_model, get_model_info, refresh_skill_matcher, get_cache_stats
+)
+from services.prediction_batcher import get_batcher
+from services.search_service import refresh_reference_data
+from services.market_service import start_market_stats_refresher, stop_market_stats_refresher, get_market_stats_info
+from services.email_service import dispatcher as email_dispatcher
+from services.inference_pool import get_inference_pool, get_inference_stats
+from services.otp_store import otp_store
+from services.password_hasher import hasher as password_hasher
+from services.history_writer import history_writer
+from services.rate_limiter import get_limits_stats
+from services.metrics import registry as metrics_registry, render_metrics
+from services.request_timing import (
+    SERVER_TIMING_ENABLED, start_request, server_timing_header, route_latency
+)
+from database import Database, AsyncDatabase
+from services.log import get_logger
+
+REQUEST_SECONDS = metrics_registry.histogram(
+    "predisalaire_http_request_duration_seconds", "Durée totale des requêtes HTTP", ("method", "route", "status"))
+
+logger = get_logger("main")
+
+
+def _reload_in_background(signum, frame):
+    def run():
+        try:
+            reload_model()
+        except Exception as e:
+            logger.error("model_reload_failed", error=e)
+    threading.Thread(target=run, name="model-reload", daemon=True).start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tables de référence chargées en mémoire avant le premier appel du frontend
+    try:
+        counts = await run_in_threadpool(refresh_reference_data)
+        logger.info("reference_data_loaded", **counts)
+    except Exception as e:
+        logger.error("reference_data_failed", error=e)
+    # Compétences de la table Competence ajoutées au matcher (liste intégrée sinon)
+    try:
+        count = await run_in_threadpool(refresh_skill_matcher)
+        logger.info("skill_matcher_built", competences=count)
+    except Exception as e:
+        logger.error("skill_matcher_failed", error=e, fallback="built-in list")
+    # Renvoi des feedbacks restés sur disque au dernier arrêt
+    feedback_buffer.start()
+    # Historique des prédictions écrit en arrière-plan (et lignes restées sur disque)
+    history_writer.start()
+    # Purge périodique des codes OTP expirés
+    otp_store.start_sweeper()
+    # Cube des statistiques de salaires construit puis mis à jour en arrière-plan
+    start_market_stats_refresher()
+    # Connexion à Google Sheets en arrière-plan : ne retarde pas le démarrage
+    threading.Thread(target=warm_sheet_client, name="sheets-warmup", daemon=True).start()
+    # Chargement + prédiction de chauffe avant d'accepter du trafic
+    await run_in_threadpool(warm_up_model)
+    # INFERENCE_BACKEND=process : processus de prédiction démarrés (et modèle chargé) avant le trafic
+    inference_pool = get_inference_pool()
+    if inference_pool is not None:
+        try:
+            await run_in_threadpool(inference_pool.start)
+        except Exception as e:
+            logger.error("inference_pool_start_failed", error=e)
+    # `kill -HUP <pid>` recharge le modèle sans redémarrer le worker
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, _reload_in_background)
+    yield
+    await AsyncDatabase.close()
+    # Les emails déjà en file partent avant l'arrêt du worker
+    await run_in_threadpool(email_dispatcher.stop)
+    await run_in_threadpool(feedback_buffer.stop)
+    await run_in_threadpool(history_writer.stop)
+    if inference_pool is not None:
+        await run_in_threadpool(inference_pool.stop)
+    otp_store.stop_sweeper()
+    stop_market_stats_refresher()
+
 
 app = FastAPI(
     title="PrediSalaire API",
     description="API de prédiction de salaire basée sur l'IA",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -28,6 +119,57 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/api")
 app.include_router(search_router, prefix="/api")
 app.include_router(prediction_router, prefix="/api")
+app.include_router(market_router, prefix="/api")
+
+
+def _route_template(request: Request) -> str:
+    """Gabarit de la route (/api/history/{entry_id}) : pas une série par identifiant."""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # Selon la version de FastAPI, route.path inclut ou non le préfixe du include_router
+    segments = request.scope["path"].split("/")
+    prefix = "/".join(segments[:max(1, len(segments) - len(template.split("/")) + 1)])
+    return prefix + template
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    started = time.perf_counter()
+    # Attente du pool, requêtes SQL... ajoutées par les services pendant la requête
+    timings = start_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - started)
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = _route_template(request)
+        REQUEST_SECONDS.labels(method=request.method, route=route, status=status).observe(elapsed)
+        route_latency.record(request.method, route, status, elapsed)
+
+
+# Compteurs existants (/stats/*, réservés à l'administration) repris dans /metrics
+metrics_registry.register_collector("predisalaire_db_sync", Database.stats.snapshot)
+metrics_registry.register_collector("predisalaire_db_async", AsyncDatabase.stats.snapshot)
+metrics_registry.register_collector("predisalaire_email", email_dispatcher.get_stats)
+metrics_registry.register_collector("predisalaire_feedback", feedback_buffer.get_stats)
+metrics_registry.register_collector("predisalaire_history", history_writer.get_stats)
+metrics_registry.register_collector("predisalaire_inference_pool", get_inference_stats)
+metrics_registry.register_collector("predisalaire_auth_hasher", password_hasher.get_stats)
+metrics_registry.register_collector("predisalaire_prediction_cache", get_cache_stats)
+metrics_registry.register_collector("predisalaire_batcher", lambda: get_batcher().get_stats() if get_batcher() else {})
+metrics_registry.register_collector("predisalaire_market", get_market_stats_info)
+metrics_registry.register_collector("predisalaire_model", get_model_info)
+metrics_registry.register_collector("predisalaire_rate_limit", lambda: get_limits_stats()["rate"])
+metrics_registry.register_collector("predisalaire_concurrency", lambda: {
+    f"{route_class}_{key}": value
+    for route_class, stats in get_limits_stats()["concurrency"].items() for key, value in stats.items()
+})
 
 
 @app.get("/")
@@ -40,6 +182,59 @@ def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/stats/routes", dependencies=[Depends(require_admin)])
+def route_stats():
+    return route_latency.get_stats()
+
+
+@app.get("/stats/limits", dependencies=[Depends(require_admin)])
+def limits_stats():
+    return get_limits_stats()
+
+
+@app.get("/stats/db", dependencies=[Depends(require_admin)])
+def db_stats():
+    return {"sync": Database.stats.snapshot(), "async": AsyncDatabase.stats.snapshot()}
+
+
+@app.get("/stats/email", dependencies=[Depends(require_admin)])
+def email_stats():
+    return email_dispatcher.get_stats()
+
+
+@app.get("/stats/feedback", dependencies=[Depends(require_admin)])
+def feedback_stats():
+    return feedback_buffer.get_stats()
+
+
+@app.get("/stats/inference", dependencies=[Depends(require_admin)])
+def inference_stats():
+    return get_inference_stats()
+
+
+@app.get("/stats/history", dependencies=[Depends(require_admin)])
+def history_stats():
+    return history_writer.get_stats()
+
+
+@app.get("/stats/auth", dependencies=[Depends(require_admin)])
+def auth_stats():
+    return password_hasher.get_stats()
+
+
+@app.get("/ready")
+def ready():
+    info = get_model_info()
+    if not info["ready"]:
+        return JSONResponse(status_code=503, content={"status": "not ready", "model": info})
+    return {"status": "ready", "model": info}
+
+
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
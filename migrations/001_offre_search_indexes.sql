@@ -0,0 +1,9 @@
+-- Index de recherche des offres
+-- FULLTEXT sur titre + description pour MATCH ... AGAINST (mot-clé)
+ALTER TABLE Offre ADD FULLTEXT INDEX ft_offre_titre_description (titre, description);
+
+-- Filtres par identifiant (metier_id, experience_id, region_id) et jointures
+CREATE INDEX idx_offre_metier ON Offre (idMetier);
+CREATE INDEX idx_offre_experience ON Offre (idExperience);
+CREATE INDEX idx_offre_departement ON Offre (idDepartement);
+CREATE INDEX idx_departement_region ON Departement (idRegion);
@@ -0,0 +1,3 @@
+-- Index sur Salaire, qui n'évite pas le tri de search_offres (Offre est la
+-- table pilote) : remplacé par idx_offre_salaire_avg (008_offre_salaire_avg.sql)
+CREATE INDEX idx_salaire_avg ON Salaire (salaire_avg, idsalaire);
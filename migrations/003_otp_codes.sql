@@ -0,0 +1,11 @@
+-- Codes OTP (réinitialisation, vérification) partagés entre workers : OTP_STORE=mysql
+CREATE TABLE IF NOT EXISTS OtpCode (
+    purpose VARCHAR(16) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    code VARCHAR(16) NOT NULL,
+    user_id INT NULL,
+    expires_at DATETIME NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (purpose, email),
+    INDEX idx_otp_expires (expires_at)
+);
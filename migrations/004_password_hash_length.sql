@@ -0,0 +1,3 @@
+-- Hachages scrypt ("scrypt$N$r$p$sel$empreinte", ~90 caractères) : la colonne
+-- dimensionnée pour un SHA-256 hexadécimal (64) est élargie
+ALTER TABLE Utilisateur MODIFY password VARCHAR(255) NOT NULL;
@@ -0,0 +1,15 @@
+-- date_predit passe d'un texte "dd/mm/YYYY HH:MM:SS" à un vrai DATETIME :
+-- le tri par date devient chronologique et peut utiliser un index
+ALTER TABLE Historique ADD COLUMN date_predit_dt DATETIME NULL;
+-- Lignes écrites avant (dd/mm/YYYY) et après parse_date_predit (datetime envoyé
+-- par le connecteur : "YYYY-mm-dd HH:MM:SS[.ffffff]") ; chaque format n'est
+-- essayé que sur les lignes qui lui ressemblent (pas d'erreur en mode strict)
+UPDATE Historique SET date_predit_dt = COALESCE(
+    IF(date_predit LIKE '__/__/____ __:__:__', STR_TO_DATE(date_predit, '%d/%m/%Y %H:%i:%s'), NULL),
+    IF(date_predit LIKE '____-__-__ __:__:__%', STR_TO_DATE(LEFT(date_predit, 19), '%Y-%m-%d %H:%i:%s'), NULL)
+);
+ALTER TABLE Historique DROP COLUMN date_predit;
+ALTER TABLE Historique CHANGE date_predit_dt date_predit DATETIME NULL;
+
+-- Historique d'un utilisateur, du plus récent au plus ancien (pagination par curseur)
+CREATE INDEX idx_historique_user_date ON Historique (idUtilisateur, date_predit, idHistorique);
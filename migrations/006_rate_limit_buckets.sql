@@ -0,0 +1,8 @@
+-- Seaux à jetons partagés entre workers : RATE_LIMIT_BACKEND=mysql
+CREATE TABLE IF NOT EXISTS RateLimitBucket (
+    bucket_key CHAR(64) NOT NULL PRIMARY KEY,
+    tokens DOUBLE NOT NULL,
+    updated_at DOUBLE NOT NULL,
+    allowed TINYINT NOT NULL DEFAULT 1,
+    INDEX idx_rate_limit_updated (updated_at)
+);
@@ -0,0 +1,4 @@
+-- Incrémenté à chaque modification de l'utilisateur (rôle, profil, mot de passe) :
+-- les tokens émis avant ne sont plus crus sur parole, dans tous les workers.
+-- À appliquer avant de déployer le code qui lit la colonne.
+ALTER TABLE Utilisateur ADD COLUMN token_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,24 @@
+-- Tri par salaire sur Offre : l'index de 002 porte sur Salaire, qui n'est pas la
+-- table pilote de search_offres (Offre LEFT JOIN Salaire) ; ORDER BY
+-- s.salaire_avg DESC, o.idOffre DESC y imposait un tri complet (filesort).
+-- salaire_avg est recopié sur Offre et indexé avec idOffre : le curseur (seek)
+-- parcourt l'index dans l'ordre, sans tri ni OFFSET.
+ALTER TABLE Offre ADD COLUMN salaire_avg DECIMAL(10,2) NULL;
+
+UPDATE Offre o JOIN Salaire s ON o.idsalaire = s.idsalaire SET o.salaire_avg = s.salaire_avg;
+
+CREATE INDEX idx_offre_salaire_avg ON Offre (salaire_avg, idOffre);
+DROP INDEX idx_salaire_avg ON Salaire;
+
+-- Copie maintenue par la base pour tous les imports (offres et salaires)
+CREATE TRIGGER trg_offre_salaire_avg_insert BEFORE INSERT ON Offre FOR EACH ROW
+    SET NEW.salaire_avg = (SELECT salaire_avg FROM Salaire WHERE idsalaire = NEW.idsalaire);
+
+CREATE TRIGGER trg_offre_salaire_avg_update BEFORE UPDATE ON Offre FOR EACH ROW
+    SET NEW.salaire_avg = (SELECT salaire_avg FROM Salaire WHERE idsalaire = NEW.idsalaire);
+
+CREATE TRIGGER trg_salaire_avg_update AFTER UPDATE ON Salaire FOR EACH ROW
+    UPDATE Offre SET salaire_avg = NEW.salaire_avg WHERE idsalaire = NEW.idsalaire;
+
+CREATE TRIGGER trg_salaire_avg_delete AFTER DELETE ON Salaire FOR EACH ROW
+    UPDATE Offre SET salaire_avg = NULL WHERE idsalaire = OLD.idsalaire;
@@ -0,0 +1,55 @@
+"""
+Applique dans l'ordre les fichiers migrations/NNN_*.sql pas encore appliqués.
+Les migrations appliquées sont enregistrées dans la table schema_migrations.
+
+    python migrations/migrate.py            # applique les migrations en attente
+    python migrations/migrate.py --list     # affiche l'état
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _statements(sql: str) -> list:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def _pending() -> list:
+    Database.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+               name VARCHAR(255) PRIMARY KEY,
+               applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+           )"""
+    )
+    applied = {row["name"] for row in Database.fetch_all("SELECT name FROM schema_migrations")}
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f, f in applied) for f in files]
+
+
+def main():
+    migrations = _pending()
+    if "--list" in sys.argv:
+        for name, applied in migrations:
+            print(f"[{'x' if applied else ' '}] {name}")
+        return
+
+    for name, applied in migrations:
+        if applied:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+            statements = _statements(f.read())
+        print(f"[MIGRATION] {name} ({len(statements)} statements)")
+        for statement in statements:
+            Database.execute(statement)
+        Database.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+    print("[MIGRATION] up to date")
+
+
+if __name__ == "__main__":
+    main()
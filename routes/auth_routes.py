@@ -6,6 +6,7 @@ from services.auth_service import (
     update_profile, change_password, generate_reset_code, reset_password, 
     change_role, send_verification_code, verify_email_code
 )
+from services.rate_limiter import rate_limiter, limit_by_ip, limit_concurrency
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -70,7 +71,7 @@ class VerifyEmailRequest(BaseModel):
     code: str
 
 
-@router.post("/register", response_model=TokenResponse)
+@router.post("/register", response_model=TokenResponse, dependencies=[Depends(limit_concurrency("auth"))])
 def register(data: RegisterRequest):
     user = register_user(
         nom=data.nom,
@@ -81,14 +82,15 @@ def register(data: RegisterRequest):
         role=data.role,
         date_creation=data.date_creation
     )
-    token = create_access_token(user["idUtilisateur"])
+    token = create_access_token(user["idUtilisateur"], user)
     return TokenResponse(access_token=token, user=UserResponse(**user))
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post("/login", response_model=TokenResponse,
+             dependencies=[Depends(limit_concurrency("auth")), Depends(limit_by_ip("login"))])
 def login(data: LoginRequest):
     user = authenticate_user(email=data.email, password=data.password)
-    token = create_access_token(user["idUtilisateur"])
+    token = create_access_token(user["idUtilisateur"], user)
     return TokenResponse(access_token=token, user=UserResponse(**user))
 
 #pas nécessaire
@@ -103,7 +105,7 @@ def update_user_profile(data: UpdateProfileRequest, current_user: dict = Depends
     return UserResponse(**user)
 
 
-@router.post("/change-password")
+@router.post("/change-password", dependencies=[Depends(limit_concurrency("auth"))])
 def change_user_password(data: ChangePasswordRequest, current_user: dict = Depends(get_current_user)):
     change_password(current_user["idUtilisateur"], data.old_password, data.new_password)
     return {"message": "Password changed successfully"}
@@ -115,25 +117,27 @@ def change_user_role(data: ChangeRoleRequest, current_user: dict = Depends(get_c
     return UserResponse(**user)
 
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(limit_concurrency("auth")), Depends(limit_by_ip("otp"))])
 def forgot_password(data: ForgotPasswordRequest):
+    rate_limiter.check("otp_email", data.email)
     result = generate_reset_code(data.email)
     return result
 
 
-@router.post("/reset-password")
+@router.post("/reset-password", dependencies=[Depends(limit_concurrency("auth"))])
 def reset_user_password(data: ResetPasswordRequest):
     reset_password(data.email, data.code, data.new_password)
     return {"message": "Password reset successfully"}
 
 
-@router.post("/send-verification")
+@router.post("/send-verification", dependencies=[Depends(limit_concurrency("auth")), Depends(limit_by_ip("otp"))])
 def send_verification(data: ForgotPasswordRequest):
+    rate_limiter.check("otp_email", data.email)
     result = send_verification_code(data.email)
     return result
 
 
-@router.post("/verify-email")
+@router.post("/verify-email", dependencies=[Depends(limit_concurrency("auth"))])
 def verify_email(data: VerifyEmailRequest):
     verify_email_code(data.email, data.code)
     return {"message": "Email verified successfully"}
@@ -4,6 +4,10 @@ from google.oauth2.service_account import Credentials
 from datetime import datetime
 import os
 import json
+import threading
+import time
+from services.log import get_logger
+from services.spool import process_spool_path, adopt_orphan_spools, append_lines, read_lines, rewrite_lines
 
 
 # --- CONFIGURATION GOOGLE SHEETS ---
@@ -15,23 +19,189 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
-# Fichier JSON avec la clé du Service Account
-creds_json = os.environ.get("GOOGLE_CREDS_JSON")
-creds_dict = json.loads(creds_json)
-# Connexion au service Google Sheets
-credentials = Credentials.from_service_account_info(
-    creds_dict, scopes=SCOPES
+SHEET_NAME = "Feedbacks"  # Nom du Google Sheet
+
+# Client construit au premier envoi (et non à l'import) : le démarrage de
+# l'API ne dépend plus du réseau ni de la disponibilité de Google Sheets
+_credentials = None
+_sheet = None
+_sheet_lock = threading.Lock()
+
+logger = get_logger("feedback")
+
+
+def get_sheet():
+    global _credentials, _sheet
+    if _sheet is None:
+        with _sheet_lock:
+            if _sheet is None:
+                if _credentials is None:
+                    # Fichier JSON avec la clé du Service Account
+                    creds_dict = json.loads(os.environ.get("GOOGLE_CREDS_JSON"))
+                    _credentials = Credentials.from_service_account_info(
+                        creds_dict, scopes=SCOPES
+                    )
+                # La session autorisée renouvelle le jeton d'accès à expiration
+                gc = gspread.authorize(_credentials)
+                _sheet = gc.open(SHEET_NAME).sheet1  # On prend la première feuille
+    return _sheet
+
+
+def reset_sheet():
+    """Oublie la feuille ouverte (les credentials restent en cache)."""
+    global _sheet
+    _sheet = None
+
+
+def warm_sheet_client():
+    try:
+        get_sheet()
+        logger.info("sheets_client_ready")
+    except Exception as e:
+        logger.error("sheets_client_unavailable", error=e)
+
+# --- FILE D'ENVOI DES FEEDBACKS ---
+# Les feedbacks sont d'abord écrits sur disque, puis envoyés par lots (append_rows).
+# Chaque worker a son fichier (feedback_spool.<pid>.jsonl, services/spool.py)
+FEEDBACK_SPOOL_PATH = os.getenv(
+    "FEEDBACK_SPOOL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "feedback_spool.jsonl")
 )
-gc = gspread.authorize(credentials)
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "50"))
+FEEDBACK_FLUSH_SECONDS = float(os.getenv("FEEDBACK_FLUSH_SECONDS", "10"))
+FEEDBACK_MAX_BACKOFF_SECONDS = float(os.getenv("FEEDBACK_MAX_BACKOFF_SECONDS", "300"))
+# Fréquence de reprise des fichiers laissés par des workers arrêtés
+FEEDBACK_ADOPT_SECONDS = float(os.getenv("FEEDBACK_ADOPT_SECONDS", "60"))
+
+
+class FeedbackBuffer:
+    """
+    File durable de lignes à ajouter dans la Google Sheet. Chaque ligne est
+    écrite (fsync) dans un fichier JSONL avant d'être acquittée ; un thread
+    envoie les lignes par lots quand FEEDBACK_BATCH_SIZE est atteint ou toutes
+    les FEEDBACK_FLUSH_SECONDS, et réessaie avec un délai croissant en cas
+    d'erreur (quota de l'API notamment). Les lignes présentes dans le fichier
+    au démarrage, et celles des workers arrêtés, sont renvoyées.
+    """
+
+    def __init__(self, get_sheet, path: str = FEEDBACK_SPOOL_PATH,
+                 batch_size: int = FEEDBACK_BATCH_SIZE, flush_seconds: float = FEEDBACK_FLUSH_SECONDS,
+                 on_error=None):
+        self._get_sheet = get_sheet
+        self._on_error = on_error
+        self.shared_path = os.path.abspath(path)
+        self.path = process_spool_path(path)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._backoff = 0.0
+        self._adopted_at = None
+        self.stats = {"enqueued": 0, "flushed": 0, "batches": 0, "errors": 0, "quota_errors": 0,
+                      "last_flush_ms": None}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._pending = read_lines(self.path)
+            if self._pending:
+                logger.info("spool_recovered", rows=len(self._pending))
+            self._adopt_locked()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="feedback-flusher", daemon=True)
+            self._thread.start()
+
+    def _adopt_locked(self):
+        # Fichier de ce seul processus : ajouts et réécritures sous self._lock
+        self._pending.extend(adopt_orphan_spools(self.shared_path, self.path))
+        self._adopted_at = time.monotonic()
+
+    def enqueue(self, row: list):
+        self.start()
+        with self._lock:
+            append_lines(self.path, [row])
+            self._pending.append(row)
+            self.stats["enqueued"] += 1
+            # Pendant un backoff (quota), on attend l'échéance même si le lot est plein
+            if len(self._pending) >= self.batch_size and not self._backoff:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Envoie un lot ; renvoie le nombre de lignes envoyées (lève en cas d'échec)."""
+        with self._lock:
+            batch = list(self._pending[:self.batch_size])
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        self._get_sheet().append_rows(batch)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            del self._pending[:len(batch)]
+            rewrite_lines(self.path, self._pending)
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["last_flush_ms"] = round(elapsed, 1)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._backoff or self.flush_seconds)
+            self._wake.clear()
+            if time.monotonic() - self._adopted_at >= FEEDBACK_ADOPT_SECONDS:
+                try:
+                    with self._lock:
+                        self._adopt_locked()
+                except OSError as e:
+                    logger.error("spool_adopt_failed", error=e)
+            try:
+                # Vide tout ce qui est prêt, lot par lot
+                while self.flush() == self.batch_size:
+                    pass
+                self._backoff = 0.0
+            except Exception as e:
+                quota = getattr(getattr(e, "response", None), "status_code", None) == 429
+                with self._lock:
+                    self.stats["errors"] += 1
+                    if quota:
+                        self.stats["quota_errors"] += 1
+                if not quota and self._on_error is not None:
+                    # Client reconstruit au prochain essai (jeton révoqué, feuille déplacée...)
+                    self._on_error()
+                self._backoff = min(FEEDBACK_MAX_BACKOFF_SECONDS, max(self.flush_seconds, self._backoff * 2))
+                logger.error("flush_failed", error="quota" if quota else e, retry_in=self._backoff)
+            if self._stopping:
+                return
+
+    def stop(self, timeout: float = 10.0):
+        """Tente un dernier envoi ; ce qui reste est conservé dans le fichier."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping = True
+        self._backoff = 0.0
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._pending)
+        stats["backoff_seconds"] = self._backoff
+        return stats
+
+
+feedback_buffer = FeedbackBuffer(get_sheet, on_error=reset_sheet)
 
-# Ouvrir la feuille par nom
-SHEET_NAME = "Feedbacks"  # Nom du Google Sheet
-sheet = gc.open(SHEET_NAME).sheet1  # On prend la première feuille
 
 # --- FONCTION D'ENVOI DE FEEDBACK ---
 def send_feedback_to_sheet(dates,user_name, user_email, feedback_text,feedback_note):
     """
-    Ajoute un feedback dans la Google Sheet.
+    Ajoute un feedback dans la file d'envoi vers la Google Sheet.
     """
     row = [dates, user_name, user_email, feedback_text,f"{feedback_note}/5"]
-    sheet.append_row(row)
\ No newline at end of file
+    feedback_buffer.enqueue(row)
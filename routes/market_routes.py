@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from typing import Optional
+import os
+from services.auth_service import require_admin
+from services.market_service import (
+    get_salary_stats, get_salary_breakdown, get_market_stats_info, refresh_market_stats
+)
+
+router = APIRouter(prefix="/market", tags=["Market"])
+
+# Le cube n'est recalculé que toutes les quelques minutes
+MARKET_MAX_AGE = int(os.getenv("MARKET_MAX_AGE", "60"))
+
+
+def _cached(content) -> JSONResponse:
+    return JSONResponse(content=content, headers={"Cache-Control": f"public, max-age={MARKET_MAX_AGE}"})
+
+
+@router.get("/salaries")
+def salary_stats(
+    metier_id: Optional[int] = Query(None),
+    region_id: Optional[int] = Query(None),
+    experience_id: Optional[int] = Query(None)
+):
+    """Nombre, médiane et percentiles de salaire_avg ; une dimension absente = toutes confondues."""
+    return _cached(get_salary_stats(metier_id, region_id, experience_id))
+
+
+@router.get("/salaries/breakdown")
+def salary_breakdown(
+    by: str = Query(..., description="metier, region, experience (séparés par des virgules)"),
+    metier_id: Optional[int] = Query(None),
+    region_id: Optional[int] = Query(None),
+    experience_id: Optional[int] = Query(None)
+):
+    dimensions = [name.strip() for name in by.split(",") if name.strip()]
+    return _cached(get_salary_breakdown(dimensions, metier_id, region_id, experience_id))
+
+
+@router.get("/stats")
+def market_stats_info():
+    return get_market_stats_info()
+
+
+@router.post("/refresh", dependencies=[Depends(require_admin)])
+async def market_refresh(full: bool = False):
+    return await run_in_threadpool(refresh_market_stats, full)
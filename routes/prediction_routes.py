@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from routes.feedback import send_feedback_to_sheet
-from services.auth_service import get_current_user
-from services.prediction_service import predict_salary, extract_competences_from_text, get_experience_level
+from services.auth_service import get_current_user, require_admin
+from services.prediction_service import (
+    predict_salaries, analyze_posting, get_model_info, reload_model, get_cache_stats
+)
+from services.prediction_batcher import predict_salary_coalesced, get_batcher
+from services.history_service import (
+    HISTORIQUE_INSERT, list_history, get_history_entry, iter_history, parse_date_predit
+)
+from services.history_writer import history_writer
+from services.rate_limiter import limit_by_user, limit_concurrency
 from database import Database
 from datetime import datetime
+import csv
+import io
+import json
+import os
+from services.log import get_logger
 
 router = APIRouter(prefix="/predict", tags=["Prediction"])
 
+BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "500"))
+
+logger = get_logger("routes.prediction")
+
 
 class PredictionRequest(BaseModel):
     titre: str
@@ -29,6 +47,20 @@ class PredictionResponse(BaseModel):
     niveau_experience: Optional[str]
     model_used: bool = False
 
+
+class BatchPredictionRequest(BaseModel):
+    items: List[PredictionRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class BatchPredictionItem(BaseModel):
+    index: int
+    result: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
+
 class historique (BaseModel):
     salaire_predit: int
     salaire_min : int
@@ -45,63 +77,177 @@ class feedback(BaseModel):
     commentaire: str
     note:str
 
-@router.post("/salary", response_model=PredictionResponse)
+def _prepare_inputs(data: PredictionRequest) -> dict:
+    competences_detectees, niveau_detecte = analyze_posting(data.titre, data.description)
+    all_competences = list(set((data.competences or []) + competences_detectees))
+    niveau_experience = data.experience or niveau_detecte
+    return {
+        "competences_detectees": competences_detectees,
+        "all_competences": all_competences,
+        "niveau_experience": niveau_experience,
+    }
+
+
+def _historique_row(data: PredictionRequest, result: dict, niveau_experience: Optional[str], user_id: int) -> tuple:
+    return (
+        result["salaire_predit"], result["salaire_min"], result["salaire_mensuel"], niveau_experience,
+        datetime.now(), data.description, ", ".join(data.competences or []),
+        data.region, user_id, data.titre
+    )
+
+
+def _to_response(result: dict, prepared: dict) -> PredictionResponse:
+    return PredictionResponse(
+        salaire_predit=result["salaire_predit"],
+        salaire_min=result["salaire_min"],
+        salaire_max=result["salaire_max"],
+        salaire_mensuel=result["salaire_mensuel"],
+        marge_erreur=result["marge_erreur"],
+        competences_detectees=prepared["competences_detectees"],
+        niveau_experience=prepared["niveau_experience"],
+        model_used=result.get("model_used", False)
+    )
+
+
+@router.post("/salary", response_model=PredictionResponse,
+             dependencies=[Depends(limit_concurrency("predict")), Depends(limit_by_user("predict"))])
 def predict(data: PredictionRequest, current_user: dict = Depends(get_current_user)):
     
-    competences_detectees = extract_competences_from_text(f"{data.titre} {data.description}")
-    all_competences = list(set((data.competences or []) + competences_detectees))
-    niveau_experience = data.experience or get_experience_level(data.description)
+    prepared = _prepare_inputs(data)
     
-    result = predict_salary(
+    result = predict_salary_coalesced(
         titre=data.titre,
         description=data.description,
         metier=data.metier,
         region=data.region,
-        experience=niveau_experience,
-        competences=all_competences,
+        experience=prepared["niveau_experience"],
+        competences=prepared["all_competences"],
     )
     
+    # Insertion différée (par lots, en arrière-plan) : la latence reste celle du modèle
+    history_writer.enqueue([
+        _historique_row(data, result, prepared["niveau_experience"], current_user["idUtilisateur"])
+    ])
+    
+    return _to_response(result, prepared)
+
+
+@router.post("/salary/batch", response_model=BatchPredictionResponse,
+             dependencies=[Depends(limit_concurrency("predict")), Depends(limit_by_user("predict"))])
+def predict_batch(data: BatchPredictionRequest, current_user: dict = Depends(get_current_user)):
+    results: List[BatchPredictionItem] = [BatchPredictionItem(index=i) for i in range(len(data.items))]
+    
+    # Extraction des compétences / expérience, erreurs isolées par item
+    valid = []
+    for i, item in enumerate(data.items):
+        try:
+            valid.append((i, item, _prepare_inputs(item)))
+        except Exception as e:
+            results[i].error = str(e)
+    
+    predictions = predict_salaries([
+        {
+            "titre": item.titre,
+            "description": item.description,
+            "metier": item.metier,
+            "region": item.region,
+            "experience": prepared["niveau_experience"],
+            "competences": prepared["all_competences"],
+        }
+        for _, item, prepared in valid
+    ])
+    
+    rows = []
+    for (i, item, prepared), result in zip(valid, predictions):
+        results[i].result = _to_response(result, prepared)
+        rows.append(_historique_row(item, result, prepared["niveau_experience"], current_user["idUtilisateur"]))
+    
+    history_writer.enqueue(rows)
+    
+    return BatchPredictionResponse(results=results)
+
+
+@router.get("/stats/batching", dependencies=[Depends(require_admin)])
+def batching_stats():
+    batcher = get_batcher()
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.get_stats()}
+
+
+@router.get("/stats/cache", dependencies=[Depends(require_admin)])
+def cache_stats():
+    return get_cache_stats()
+
+
+@router.get("/model", dependencies=[Depends(require_admin)])
+def model_info():
+    return get_model_info()
+
+
+@router.post("/model/reload", dependencies=[Depends(require_admin)])
+def model_reload():
     try:
-        Database.execute(
-            """ INSERT INTO Historique(salaire_predit,salaire_min,salaire_mensuel,niveau_experience, date_predit,description,competences,region, idUtilisateur,titre)
-            VALUES (%s, %s, %s,%s, %s, %s,%s, %s, %s, %s)""",
-            (result["salaire_predit"],result["salaire_min"],result["salaire_mensuel"], niveau_experience,datetime.now().strftime("%d/%m/%Y %H:%M:%S"),data.description,data.competences,data.region,current_user["idUtilisateur"], data.titre)
-        )
+        return reload_model()
     except Exception as e:
-        print("ERREUR SQL :", e)
-    
-    return PredictionResponse(
-        salaire_predit=result["salaire_predit"],
-        salaire_min=result["salaire_min"],
-        salaire_max=result["salaire_max"],
-        salaire_mensuel=result["salaire_mensuel"],
-        marge_erreur=result["marge_erreur"],
-        competences_detectees=competences_detectees,
-        niveau_experience=niveau_experience,
-        model_used=result.get("model_used", False)
-    )
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
 
 
 @router.get("/history")
-def get_history(current_user: dict = Depends(get_current_user)):
-    return Database.fetch_all(
-        """SELECT *
-           FROM Historique
-           WHERE idUtilisateur = %s
-           ORDER BY date_predit DESC""",
-        (current_user["idUtilisateur"],)
-    )
+def get_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    # Corps inchangé (liste) ; la page suivante s'obtient avec ?cursor=<X-Next-Cursor>
+    rows, next_cursor = list_history(current_user["idUtilisateur"], limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@router.get("/history/export")
+def export_history(format: str = Query("jsonl", pattern="^(jsonl|csv)$"), current_user: dict = Depends(get_current_user)):
+    rows = iter_history(current_user["idUtilisateur"])
+
+    def jsonl():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+    def csv_lines():
+        buffer = io.StringIO()
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if format == "csv":
+        return StreamingResponse(csv_lines(), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=historique.csv"})
+    return StreamingResponse(jsonl(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=historique.jsonl"})
+
+
+@router.get("/history/{history_id}")
+def get_history_detail(history_id: int, current_user: dict = Depends(get_current_user)):
+    return get_history_entry(current_user["idUtilisateur"], history_id)
 
 @router.post("/historique")
 def post_history(data: historique,current_user: dict = Depends(get_current_user)):
+    date_predit = parse_date_predit(data.date_predit)
     try:
         Database.execute(
-            """ INSERT INTO Historique(salaire_predit,salaire_min,salaire_mensuel,niveau_experience, date_predit,description,competences,region, idUtilisateur,titre)
-            VALUES (%s, %s, %s,%s, %s, %s,%s, %s, %s, %s)""",
-            (data.salaire_predit,data.salaire_min,data.salaire_mensuel, data.niveau_experience,data.date_predit,data.description,data.competences,data.region,current_user["idUtilisateur"], data.titre)
+            HISTORIQUE_INSERT,
+            (data.salaire_predit,data.salaire_min,data.salaire_mensuel, data.niveau_experience,date_predit,data.description,data.competences,data.region,current_user["idUtilisateur"], data.titre)
         )
     except Exception as e:
-        print("ERREUR SQL :", e)
+        logger.error("history_insert_failed", error=e)
 
 
 @router.post("/feedback")
@@ -110,5 +256,5 @@ def post_feedback(data:feedback,current_user: dict= Depends(get_current_user)):
         send_feedback_to_sheet(data.dates,current_user["nom"],current_user["email"],data.commentaire,data.note)
         return "validé"
     except Exception as e:
-        print("ERREUR FeedBack :", e)
+        logger.error("feedback_failed", error=e)
     
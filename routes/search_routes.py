@@ -1,31 +1,54 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response, Depends
+from fastapi.responses import JSONResponse
 from typing import Optional
+import os
+from services.auth_service import require_admin
+from services.prediction_service import refresh_skill_matcher
 from services.search_service import (
-    get_all_metiers, get_all_regions, get_all_experiences,
-    get_all_competences, search_offres, get_offre_by_id
+    get_reference, refresh_reference_data, search_offres, get_offre_by_id_async
 )
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
+# Durée pendant laquelle le navigateur réutilise sa copie sans revalider
+REFERENCE_MAX_AGE = int(os.getenv("REFERENCE_MAX_AGE", "300"))
+
+
+def _reference_response(request: Request, name: str) -> Response:
+    data, etag = get_reference(name)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={REFERENCE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=data, headers=headers)
+
 
 @router.get("/metiers")
-def list_metiers():
-    return get_all_metiers()
+def list_metiers(request: Request):
+    return _reference_response(request, "metiers")
 
 
 @router.get("/regions")
-def list_regions():
-    return get_all_regions()
+def list_regions(request: Request):
+    return _reference_response(request, "regions")
 
 
 @router.get("/experiences")
-def list_experiences():
-    return get_all_experiences()
+def list_experiences(request: Request):
+    return _reference_response(request, "experiences")
 
 
 @router.get("/competences")
-def list_competences():
-    return get_all_competences()
+def list_competences(request: Request):
+    return _reference_response(request, "competences")
+
+
+@router.post("/refresh", dependencies=[Depends(require_admin)])
+def refresh_reference():
+    counts = refresh_reference_data()
+    # Le matcher de compétences suit la table Competence
+    counts["competences_matcher"] = refresh_skill_matcher()
+    return counts
 
 
 @router.get("/offres")
@@ -37,7 +60,12 @@ def search(
     salaire_max: Optional[float] = Query(None),
     keyword: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    metier_id: Optional[int] = Query(None),
+    region_id: Optional[int] = Query(None),
+    experience_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True)
 ):
     return search_offres(
         metier=metier,
@@ -47,13 +75,18 @@ def search(
         salaire_max=salaire_max,
         keyword=keyword,
         page=page,
-        limit=limit
+        limit=limit,
+        metier_id=metier_id,
+        region_id=region_id,
+        experience_id=experience_id,
+        cursor=cursor,
+        include_total=include_total
     )
 
 
 @router.get("/offres/{offre_id}")
-def get_offre(offre_id: int):
-    offre = get_offre_by_id(offre_id)
+async def get_offre(offre_id: int):
+    offre = await get_offre_by_id_async(offre_id)
     if not offre:
         raise HTTPException(status_code=404, detail="Offre not found")
     return offre
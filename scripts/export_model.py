@@ -0,0 +1,63 @@
+"""
+Exporte salary_model_xgboost.pkl au format de services/model_format.py
+(booster XGBoost natif + tableaux numpy en mmap), puis vérifie que les deux
+formats donnent exactement les mêmes prédictions.
+
+    python scripts/export_model.py                          # vers services/salary_model/
+    python scripts/export_model.py --output /srv/models/salary_model --booster-format json
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+from services import prediction_service
+from services.model_format import ExportedSalaryModel, export_pipeline
+
+CHECK_POSTINGS = [
+    prediction_service.WARMUP_SAMPLE,
+    {"titre": "Data Scientist", "description": "Machine learning, Python, SQL. Junior accepté.",
+     "metier": "", "region": "Bretagne", "experience": "Junior (0-2 ans)"},
+    {"titre": "Chef de projet", "description": "", "metier": "inconnu", "region": "", "experience": ""},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None, help="pickle source (défaut : recherche habituelle)")
+    parser.add_argument("--output", default=None, help="dossier de l'export (défaut : salary_model/ à côté du pickle)")
+    parser.add_argument("--booster-format", choices=["ubj", "json"], default="ubj")
+    args = parser.parse_args()
+
+    model_path = args.model or prediction_service._get_model_path()
+    if model_path is None:
+        raise SystemExit("Modèle introuvable")
+    output = args.output or os.path.join(os.path.dirname(model_path), "salary_model")
+
+    with open(model_path, "rb") as f:
+        raw = f.read()
+    pipeline, version, _ = prediction_service._load_pickle(model_path, raw)
+    manifest = export_pipeline(pipeline, output, version, source=model_path, booster_format=args.booster_format)
+
+    rows = pd.DataFrame([
+        prediction_service._build_features(
+            posting["titre"], posting["description"], posting.get("metier"), posting.get("region"),
+            posting.get("experience"), prediction_service.extract_competences_from_text(posting["description"])
+        )
+        for posting in CHECK_POSTINGS
+    ])
+    expected = pipeline.predict(rows)
+    actual = ExportedSalaryModel(output).predict(rows)
+    if not np.array_equal(expected, actual):
+        raise SystemExit(f"Prédictions différentes : {expected} != {actual}")
+
+    size = sum(os.path.getsize(os.path.join(output, name)) for name in os.listdir(output))
+    print(f"Export {version} -> {output} ({size / 1e6:.1f} Mo, {manifest['n_features']} variables), "
+          f"prédictions identiques sur {len(rows)} offres")
+
+
+if __name__ == "__main__":
+    main()
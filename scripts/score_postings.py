@@ -0,0 +1,186 @@
+"""
+Estimation des salaires d'un fichier d'offres complet (export de job board),
+sans passer par l'API. Le fichier est lu par blocs de --chunk-size lignes ;
+chaque bloc suit la même préparation que POST /predict/salary (compétences
+et niveau d'expérience détectés, text_features) puis un seul appel au modèle.
+Les résultats sont écrits au fil de l'eau : la mémoire reste bornée quelle
+que soit la taille du fichier.
+
+Colonnes lues : titre, description et, si présentes, metier, region,
+experience, competences (liste séparée par des virgules). Formats d'entrée et
+de sortie déduits de l'extension : .csv, .jsonl, .parquet (pyarrow requis).
+
+    python scripts/score_postings.py offres.csv predictions.csv
+    python scripts/score_postings.py offres.parquet predictions.jsonl --workers 4 --chunk-size 5000
+    python scripts/score_postings.py offres.jsonl out.csv --keep idOffre,titre --db-skills
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+from services import prediction_service
+
+INPUT_COLUMNS = ["titre", "description", "metier", "region", "experience", "competences"]
+OUTPUT_COLUMNS = ["competences_detectees", "niveau_experience", "salaire_predit", "salaire_min",
+                  "salaire_max", "salaire_mensuel", "model_used"]
+
+
+def _format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".jsonl", ".parquet"):
+        return ext[1:]
+    if ext == ".ndjson":
+        return "jsonl"
+    raise SystemExit(f"Format non supporté : {path} (.csv, .jsonl ou .parquet)")
+
+
+def read_chunks(path: str, chunk_size: int):
+    fmt = _format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class ChunkWriter:
+    """Ajoute les blocs de résultats au fichier de sortie, dans l'ordre d'arrivée."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = _format(path)
+        self._parquet = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if self.format == "csv":
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        elif self.format == "jsonl":
+            with open(self.path, "a" if self._started else "w", encoding="utf-8") as f:
+                text = df.to_json(orient="records", lines=True, force_ascii=False)
+                # Selon la version de pandas, la dernière ligne finit ou non par un saut de ligne
+                f.write(text if not text or text.endswith("\n") else text + "\n")
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        self._started = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def _text(value) -> str:
+    return "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+
+
+def _worker_init(db_skills: bool):
+    # Un modèle (et un matcher) par processus, chargés une fois
+    if db_skills:
+        prediction_service.refresh_skill_matcher()
+    prediction_service.load_model()
+
+
+def score_chunk(df: pd.DataFrame, keep: list = None) -> tuple:
+    """Renvoie (bloc de sortie, secondes d'extraction, secondes de prédiction)."""
+    columns = {name: (df[name].map(_text) if name in df else pd.Series([""] * len(df), index=df.index))
+               for name in INPUT_COLUMNS}
+
+    started = time.perf_counter()
+    items, detected, levels = [], [], []
+    for titre, description, metier, region, experience, competences in zip(*(columns[n] for n in INPUT_COLUMNS)):
+        # Même préparation que _prepare_inputs dans routes/prediction_routes.py
+        competences_detectees, niveau_detecte = prediction_service.analyze_posting(titre, description)
+        provided = [c.strip() for c in competences.split(",") if c.strip()]
+        niveau = experience or niveau_detecte
+        detected.append(", ".join(competences_detectees))
+        levels.append(niveau)
+        items.append({
+            "titre": titre,
+            "description": description,
+            "metier": metier or None,
+            "region": region or None,
+            "experience": niveau,
+            "competences": list(set(provided + competences_detectees)),
+        })
+    extracted = time.perf_counter()
+
+    results = prediction_service.predict_salaries(items, use_cache=False)
+    predicted = time.perf_counter()
+
+    out = df[keep].copy() if keep else df.copy()
+    out["competences_detectees"] = detected
+    out["niveau_experience"] = levels
+    for name in OUTPUT_COLUMNS[2:]:
+        out[name] = [result[name] for result in results]
+    return out, extracted - started, predicted - extracted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimation des salaires d'un fichier d'offres")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=1, help="processus de prédiction (1 = dans ce processus)")
+    parser.add_argument("--keep", default=None, help="colonnes d'entrée à recopier (défaut : toutes)")
+    parser.add_argument("--db-skills", action="store_true", help="compétences de la table Competence en plus de la liste connue")
+    args = parser.parse_args()
+
+    keep = [c.strip() for c in args.keep.split(",")] if args.keep else None
+    writer = ChunkWriter(args.output)
+    totals = {"rows": 0, "model": 0, "extract_s": 0.0, "predict_s": 0.0}
+    started = time.perf_counter()
+
+    def collect(result):
+        out, extract_s, predict_s = result
+        writer.write(out)
+        totals["rows"] += len(out)
+        totals["model"] += int(out["model_used"].sum())
+        totals["extract_s"] += extract_s
+        totals["predict_s"] += predict_s
+        elapsed = time.perf_counter() - started
+        print(f"\r  {totals['rows']:>10} offres  {totals['rows'] / elapsed:8.0f} offres/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        if args.workers <= 1:
+            _worker_init(args.db_skills)
+            for chunk in read_chunks(args.input, args.chunk_size):
+                collect(score_chunk(chunk, keep))
+        else:
+            # Au plus 2 blocs en attente par processus : lecture bornée, ordre conservé
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_worker_init,
+                                     initargs=(args.db_skills,)) as pool:
+                pending = deque()
+                for chunk in read_chunks(args.input, args.chunk_size):
+                    pending.append(pool.submit(score_chunk, chunk, keep))
+                    if len(pending) >= args.workers * 2:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rows = totals["rows"]
+    print(file=sys.stderr)
+    print(f"{rows} offres en {elapsed:.1f} s : {rows / elapsed if elapsed else 0:.0f} offres/s "
+          f"({args.workers} processus, blocs de {args.chunk_size})")
+    print(f"  modèle : {totals['model']} / {rows} (sinon estimation heuristique)")
+    print(f"  extraction {totals['extract_s']:.1f} s, prédiction {totals['predict_s']:.1f} s (cumul des processus)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
 from datetime import datetime, timedelta
 import jwt
 import pytz
-import hashlib
+import hmac
 import random
 import string
-from fastapi import HTTPException, Depends
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from database import Database
 from services.email_service import send_otp_email
+from services.otp_store import otp_store
+from services.password_hasher import hasher, needs_rehash
 import os
 from dotenv import load_dotenv
 
@@ -16,24 +22,118 @@ load_dotenv(".env.secret") # Charger les variables d'environnements
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 JWT_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRE_HOURS"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") # jeton des opérations d'administration (désactivées si absent)
+OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", "15"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5")) # essais avant invalidation du code
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+# Durée pendant laquelle un worker réutilise le token_version lu en base : aucune
+# lecture par requête. Le worker qui modifie l'utilisateur vide son cache aussitôt,
+# les autres voient le changement au plus tard après ce délai ; 0 : lu à chaque requête
+AUTH_TOKEN_VERSION_TTL = float(os.getenv("AUTH_TOKEN_VERSION_TTL", "30"))
 security = HTTPBearer()
-reset_codes = {}
-verify_codes = {}
 
 tz = pytz.timezone("Europe/Paris")
 
-#hashage du mot de passe
+#hashage du mot de passe (scrypt, dans le pool dédié)
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hasher.hash(password)
 
-#vérification mot de passe
+#vérification mot de passe (accepte aussi les anciens hachages SHA-256)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hash_password(plain_password) == hashed_password
+    return hasher.verify(plain_password, hashed_password)
+
+# Champs de l'utilisateur embarqués dans le token (claim "usr")
+USER_CLAIMS = ("nom", "prenom", "email", "statut", "location", "date_creation", "role")
+
+USER_QUERY = """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.statut,u.location,u.date_creation, t.libelle as role,
+                  u.token_version
+           FROM Utilisateur as u
+           LEFT JOIN TypeDeCompte t ON u.idTypeCompte = t.idTypeCompte
+           WHERE u.idUtilisateur = %s"""
+
+
+class _TTLCache:
+    """Cache LRU à durée de vie, par idUtilisateur."""
+
+    def __init__(self, ttl: float, max_size: int = AUTH_USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def put(self, user_id: int, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+# Utilisateurs chargés par USER_QUERY : valides tant que leur token_version est le courant
+_user_cache = _TTLCache(AUTH_USER_CACHE_TTL)
+_token_versions = _TTLCache(AUTH_TOKEN_VERSION_TTL)
+
+# Toute modification de l'utilisateur (rôle, profil, mot de passe) incrémente
+# Utilisateur.token_version (migrations/007) : les claims des tokens émis avant
+# ne sont plus utilisés, dans tous les workers
+BUMP_TOKEN_VERSION = "token_version = token_version + 1"
+
+
+def invalidate_user(user_id: int):
+    _user_cache.invalidate(int(user_id))
+    _token_versions.invalidate(int(user_id))
+
+
+def _update_user(user_id: int, assignments: str, params: tuple):
+    """UPDATE Utilisateur avec incrément de token_version ; les caches du worker sont vidés dans la foulée."""
+    Database.execute(
+        f"UPDATE Utilisateur SET {assignments}, {BUMP_TOKEN_VERSION} WHERE idUtilisateur = %s",
+        params + (user_id,)
+    )
+    invalidate_user(user_id)
+
+
+def _current_token_version(user_id: int) -> Optional[int]:
+    version = _token_versions.get(user_id)
+    if version is None:
+        row = Database.fetch_one("SELECT token_version FROM Utilisateur WHERE idUtilisateur = %s", (user_id,))
+        if not row:
+            return None
+        version = row["token_version"]
+        _token_versions.put(user_id, version)
+    return version
+
 
 #creation de token
-def create_access_token(user_id: int) -> str:
+def create_access_token(user_id: int, user: Optional[dict] = None) -> str:
     expire = datetime.now(tz) + timedelta(hours=JWT_EXPIRE_HOURS)
-    payload = {"sub": str(user_id), "exp": expire}
+    payload = {"sub": str(user_id), "exp": expire, "iat": datetime.now(tz)}
+    if user is not None:
+        # Identité et rôle dans le token, valables tant que token_version n'a pas changé
+        payload["ver"] = user.get("token_version") or 0
+        payload["usr"] = {
+            key: value if value is None or isinstance(value, (str, int, float)) else str(value)
+            for key, value in ((key, user.get(key)) for key in USER_CLAIMS)
+        }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 #decode du token
@@ -52,20 +152,35 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = int(user_id)
     
-    user = Database.fetch_one(
-        """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.statut,u.location,u.date_creation, t.libelle as role
-           FROM Utilisateur as u
-           LEFT JOIN TypeDeCompte t ON u.idTypeCompte = t.idTypeCompte
-           WHERE u.idUtilisateur = %s""",
-        (int(user_id),)
-    )
-    
-    if not user:
+    # Lecture par clé primaire (ou cache de AUTH_TOKEN_VERSION_TTL secondes) :
+    # un utilisateur supprimé ou modifié dans un autre worker est vu ici
+    version = _current_token_version(user_id)
+    if version is None:
         raise HTTPException(status_code=401, detail="User not found")
     
+    # Claims du token, sauf si l'utilisateur a été modifié depuis son émission
+    claims = payload.get("usr")
+    if claims is not None and payload.get("ver", 0) == version:
+        return {"idUtilisateur": user_id, **claims}
+    
+    user = _user_cache.get(user_id)
+    if user is None or user["token_version"] != version:
+        user = Database.fetch_one(USER_QUERY, (user_id,))
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        _user_cache.put(user_id, user)
+    
+    user = dict(user)
+    user.pop("token_version", None)
     return user
 
+#vérification du jeton d'administration (header X-Admin-Token)
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
 #génération du code random
 def generate_code() -> str:
     return ''.join(random.choices(string.digits, k=6))
@@ -92,6 +207,7 @@ def register_user(nom: str, prenom: str, email: str, password: str, role: str, l
         "nom": nom,
         "prenom": prenom,
         "email": email,
+        "statut": "actif",
         "location":location,
         "role": role,
         "date_creation":date_creation
@@ -100,7 +216,8 @@ def register_user(nom: str, prenom: str, email: str, password: str, role: str, l
 
 def authenticate_user(email: str, password: str) -> dict:
     user = Database.fetch_one(
-        """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.password, u.statut,u.location,u.date_creation, t.libelle as role
+        """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.password, u.statut,u.location,u.date_creation, t.libelle as role,
+                  u.token_version
            FROM Utilisateur u
            LEFT JOIN TypeDeCompte t ON u.idTypeCompte = t.idTypeCompte
            WHERE u.email = %s""",
@@ -110,6 +227,14 @@ def authenticate_user(email: str, password: str) -> dict:
     if not user or not verify_password(password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    if needs_rehash(user["password"]):
+        # Migration transparente vers le hachage courant, sans rallonger le login ;
+        # la condition sur l'ancien hachage évite d'écraser un changement concurrent
+        hasher.rehash_in_background(password, lambda hashed: Database.execute(
+            "UPDATE Utilisateur SET password = %s WHERE idUtilisateur = %s AND password = %s",
+            (hashed, user["idUtilisateur"], user["password"])
+        ))
+    
     return {
         "idUtilisateur": user["idUtilisateur"],
         "nom": user["nom"],
@@ -118,14 +243,12 @@ def authenticate_user(email: str, password: str) -> dict:
         "statut": user["statut"],
         "role": user["role"],
         "location":user["location"],
-        "date_creation":user["date_creation"]
+        "date_creation":user["date_creation"],
+        "token_version": user["token_version"]
     }
 
 def update_profile(user_id: int, nom: str, prenom: str,loction:str) -> dict:
-    Database.execute(
-        "UPDATE Utilisateur SET nom = %s, prenom = %s, location = %s WHERE idUtilisateur = %s",
-        (nom, prenom, user_id,loction)
-    )
+    _update_user(user_id, "nom = %s, prenom = %s, location = %s", (nom, prenom, loction))
     return Database.fetch_one(
         """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.statut,u.location, t.libelle as role
            FROM Utilisateur u
@@ -140,10 +263,7 @@ def change_password(user_id: int, old_password: str, new_password: str) -> bool:
     if not user or not verify_password(old_password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid current password")
     
-    Database.execute(
-        "UPDATE Utilisateur SET password = %s WHERE idUtilisateur = %s",
-        (hash_password(new_password), user_id)
-    )
+    _update_user(user_id, "password = %s", (hash_password(new_password),))
     return True
 
 
@@ -155,10 +275,7 @@ def change_role(user_id: int, new_role: str) -> dict:
     if not type_compte:
         raise HTTPException(status_code=400, detail="Invalid role")
     
-    Database.execute(
-        "UPDATE Utilisateur SET idTypeCompte = %s WHERE idUtilisateur = %s",
-        (type_compte["idTypeCompte"], user_id)
-    )
+    _update_user(user_id, "idTypeCompte = %s", (type_compte["idTypeCompte"],))
     
     return Database.fetch_one(
         """SELECT u.idUtilisateur, u.nom, u.prenom, u.email, u.statut, t.libelle as role
@@ -175,73 +292,68 @@ def generate_reset_code(email: str) -> dict:
         raise HTTPException(status_code=404, detail="Email not found")
     
     code = generate_code()
-    reset_codes[email] = {
-        "code": code,
-        "expires": datetime.utcnow() + timedelta(minutes=15),
-        "user_id": user["idUtilisateur"]
-    }
+    otp_store.put("reset", email, code, timedelta(minutes=OTP_TTL_MINUTES), user_id=user["idUtilisateur"])
     
-    email_sent = send_otp_email(email, code, purpose="reset")
+    # L'email part en arrière-plan : on répond dès sa mise en file
+    email_queued = send_otp_email(email, code, purpose="reset")
     
     return {
-        "message": "Reset code sent to email" if email_sent else "Failed to send email",
-        "email_sent": email_sent
+        "message": "Reset code queued for delivery" if email_queued else "Failed to send email",
+        "email_sent": email_queued,
+        "email_status": "queued" if email_queued else "failed"
     }
 
 
-def verify_reset_code(email: str, code: str) -> bool:
-    if email not in reset_codes:
-        raise HTTPException(status_code=400, detail="No reset code found")
+#vérification d'un code OTP (expiration, nombre d'essais) ; renvoie l'entrée du store
+def _check_otp(purpose: str, email: str, code: str, not_found: str) -> dict:
+    data = otp_store.get(purpose, email)
+    if data is None:
+        raise HTTPException(status_code=400, detail=not_found)
     
-    data = reset_codes[email]
     if datetime.utcnow() > data["expires"]:
-        del reset_codes[email]
+        otp_store.delete(purpose, email)
         raise HTTPException(status_code=400, detail="Code expired")
     
-    if data["code"] != code:
+    # Essai décompté avant la comparaison, limite comprise : des requêtes
+    # simultanées (plusieurs workers) ne dépassent pas OTP_MAX_ATTEMPTS essais
+    if not otp_store.take_attempt(purpose, email, OTP_MAX_ATTEMPTS):
+        otp_store.delete(purpose, email)
+        raise HTTPException(status_code=429, detail="Too many attempts")
+    
+    # En octets : compare_digest refuse les str non ASCII (TypeError -> 500)
+    if not hmac.compare_digest(data["code"].encode(), code.encode()):
         raise HTTPException(status_code=400, detail="Invalid code")
     
+    return data
+
+
+def verify_reset_code(email: str, code: str) -> bool:
+    _check_otp("reset", email, code, "No reset code found")
     return True
 
 
 def reset_password(email: str, code: str, new_password: str) -> bool:
-    verify_reset_code(email, code)
+    data = _check_otp("reset", email, code, "No reset code found")
     
-    data = reset_codes[email]
-    Database.execute(
-        "UPDATE Utilisateur SET password = %s WHERE idUtilisateur = %s",
-        (hash_password(new_password), data["user_id"])
-    )
-    del reset_codes[email]
+    _update_user(data["user_id"], "password = %s", (hash_password(new_password),))
+    otp_store.delete("reset", email)
     return True
 
 
 def send_verification_code(email: str) -> dict:
     code = generate_code()
-    verify_codes[email] = {
-        "code": code,
-        "expires": datetime.utcnow() + timedelta(minutes=15)
-    }
+    otp_store.put("verify", email, code, timedelta(minutes=OTP_TTL_MINUTES))
     
-    email_sent = send_otp_email(email, code, purpose="verify")
+    email_queued = send_otp_email(email, code, purpose="verify")
     
     return {
-        "message": "Verification code sent" if email_sent else "Failed to send email",
-        "email_sent": email_sent
+        "message": "Verification code queued for delivery" if email_queued else "Failed to send email",
+        "email_sent": email_queued,
+        "email_status": "queued" if email_queued else "failed"
     }
 
 
 def verify_email_code(email: str, code: str) -> bool:
-    if email not in verify_codes:
-        raise HTTPException(status_code=400, detail="No verification code found")
-    
-    data = verify_codes[email]
-    if datetime.utcnow() > data["expires"]:
-        del verify_codes[email]
-        raise HTTPException(status_code=400, detail="Code expired")
-    
-    if data["code"] != code:
-        raise HTTPException(status_code=400, detail="Invalid code")
-    
-    del verify_codes[email]
+    _check_otp("verify", email, code, "No verification code found")
+    otp_store.delete("verify", email)
     return True
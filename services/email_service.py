@@ -1,22 +1,27 @@
 import smtplib
+import queue
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 # from dotenv import load_dotenv
-import os 
+import os
+from services.log import get_logger
 # load_dotenv(".env.secret") # Charger les variables d'environnements
 
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT =int(os.getenv("SMTP_PORT"))
 SMTP_EMAIL = os.getenv("SMTP_EMAIL")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "15"))
 
-def send_otp_email(to_email: str, code: str, purpose: str = "reset") -> bool:
-    print("EMAIL FUNCTION STARTED")
-    print(SMTP_EMAIL)
-    try:
-        if purpose == "reset":
-            subject = "Market Visualizer - Code de réinitialisation"
-            body = f"""
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+# Connexion SMTP fermée après cette durée sans email à envoyer
+EMAIL_IDLE_SECONDS = float(os.getenv("EMAIL_IDLE_SECONDS", "30"))
+
+_RESET_TEMPLATE = """
             <html>
             <body style="font-family: Arial, sans-serif; padding: 20px;">
                 <div style="max-width: 500px; margin: 0 auto; background: #f8fafc; padding: 30px; border-radius: 10px;">
@@ -34,9 +39,8 @@ def send_otp_email(to_email: str, code: str, purpose: str = "reset") -> bool:
             </body>
             </html>
             """
-        else:
-            subject = "Market Visualizer - Vérification de votre email"
-            body = f"""
+
+_VERIFY_TEMPLATE = """
             <html>
             <body style="font-family: Arial, sans-serif; padding: 20px;">
                 <div style="max-width: 500px; margin: 0 auto; background: #f8fafc; padding: 30px; border-radius: 10px;">
@@ -54,21 +58,152 @@ def send_otp_email(to_email: str, code: str, purpose: str = "reset") -> bool:
             </html>
             """
 
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = f"Market Visualizer <{SMTP_EMAIL}>"
-        msg["To"] = to_email
+# Gabarits découpés une fois autour du code : (sujet, avant, après)
+TEMPLATES = {
+    "reset": ("Market Visualizer - Code de réinitialisation", *_RESET_TEMPLATE.split("{code}")),
+    "verify": ("Market Visualizer - Vérification de votre email", *_VERIFY_TEMPLATE.split("{code}")),
+}
+
+logger = get_logger("email")
+
+
+def render_otp_email(to_email: str, code: str, purpose: str = "reset") -> MIMEMultipart:
+    subject, head, tail = TEMPLATES["reset" if purpose == "reset" else "verify"]
+
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"Market Visualizer <{SMTP_EMAIL}>"
+    msg["To"] = to_email
+
+    msg.attach(MIMEText(head + code + tail, "html"))
+    return msg
+
+
+class EmailDispatcher:
+    """
+    File d'envoi vidée par un thread de fond. La connexion SMTP authentifiée
+    est réutilisée d'un email à l'autre ; un envoi en échec est reprogrammé
+    avec un délai exponentiel, jusqu'à EMAIL_MAX_ATTEMPTS tentatives.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=EMAIL_QUEUE_SIZE)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._server = None
+        self._stats_lock = threading.Lock()
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "rejected": 0, "connections": 0}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
 
-        msg.attach(MIMEText(body, "html"))
-        print(SMTP_PASSWORD)
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_EMAIL, SMTP_PASSWORD)
-            server.sendmail(SMTP_EMAIL, to_email, msg.as_string())
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+                self._thread.start()
 
-        print(f"[EMAIL] Code {code} sent to {to_email}")
+    def enqueue(self, to_email: str, msg: MIMEMultipart, attempt: int = 1) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((to_email, msg, attempt))
+        except queue.Full:
+            self._count("rejected")
+            logger.error("queue_full", to=to_email)
+            return False
+        if attempt == 1:
+            self._count("queued")
         return True
 
+    def _connect(self) -> smtplib.SMTP:
+        if self._server is None:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            if SMTP_STARTTLS:
+                server.starttls()
+            if SMTP_EMAIL and SMTP_PASSWORD:
+                server.login(SMTP_EMAIL, SMTP_PASSWORD)
+            self._server = server
+            self._count("connections")
+        return self._server
+
+    def _disconnect(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _send(self, to_email: str, msg: MIMEMultipart):
+        try:
+            self._connect().sendmail(SMTP_EMAIL, to_email, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # Connexion fermée par le serveur pendant l'inactivité : une reconnexion
+            self._server = None
+            self._connect().sendmail(SMTP_EMAIL, to_email, msg.as_string())
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=EMAIL_IDLE_SECONDS)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if job is None:
+                self._disconnect()
+                return
+
+            to_email, msg, attempt = job
+            try:
+                self._send(to_email, msg)
+                self._count("sent")
+                logger.info("sent", to=to_email)
+            except Exception as e:
+                self._disconnect()
+                if attempt >= EMAIL_MAX_ATTEMPTS:
+                    self._count("failed")
+                    logger.error("send_abandoned", to=to_email, attempts=attempt, error=e)
+                else:
+                    delay = EMAIL_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                    self._count("retried")
+                    logger.warning("send_failed", to=to_email, error=e, retry_in=delay)
+                    timer = threading.Timer(delay, self.enqueue, args=(to_email, msg, attempt + 1))
+                    timer.daemon = True
+                    timer.start()
+            finally:
+                self._queue.task_done()
+
+    def stop(self, timeout: float = 5.0):
+        """Envoie les emails déjà en file puis arrête le thread (au plus `timeout` secondes)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+
+dispatcher = EmailDispatcher()
+
+
+def send_otp_email(to_email: str, code: str, purpose: str = "reset") -> bool:
+    """
+    Met l'email en file d'envoi et rend la main immédiatement.
+    Renvoie False seulement si la file est pleine.
+    """
+    try:
+        msg = render_otp_email(to_email, code, purpose)
     except Exception as e:
-        print(f"[EMAIL ERROR] Failed to send email: {e}")
+        logger.error("build_failed", error=e)
         return False
+    return dispatcher.enqueue(to_email, msg)
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from database import Database
+from services.search_service import _encode_cursor, _decode_cursor, _keyset_condition
+
+# Format historique de date_predit, conservé dans les réponses de l'API
+DATE_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Colonnes de la liste : la description (texte long) n'est renvoyée que par le détail
+HISTORY_LIST_COLUMNS = """idHistorique, titre, region, niveau_experience, competences,
+           salaire_predit, salaire_min, salaire_mensuel, date_predit"""
+
+EXPORT_CHUNK_SIZE = 500
+
+HISTORIQUE_INSERT = """ INSERT INTO Historique(salaire_predit,salaire_min,salaire_mensuel,niveau_experience, date_predit,description,competences,region, idUtilisateur,titre)
+            VALUES (%s, %s, %s,%s, %s, %s,%s, %s, %s, %s)"""
+
+
+def parse_date_predit(value: Optional[str]) -> datetime:
+    """Date envoyée par le client ("dd/mm/YYYY HH:MM:SS" ou ISO 8601), à défaut maintenant."""
+    if not value:
+        return datetime.now()
+    for parse in (lambda v: datetime.strptime(v, DATE_FORMAT), datetime.fromisoformat):
+        try:
+            return parse(value.strip())
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail="Invalid date_predit")
+
+
+def _format_row(row: dict) -> dict:
+    if isinstance(row.get("date_predit"), datetime):
+        row["date_predit"] = row["date_predit"].strftime(DATE_FORMAT)
+    return row
+
+
+def _fetch_page(user_id: int, columns: str, limit: int, after: Optional[list]) -> list:
+    seek_clause, seek_params = "", []
+    if after is not None:
+        seek_clause, seek_params = _keyset_condition([
+            ("date_predit", [], after[0], True),
+            ("idHistorique", [], after[1], False),
+        ])
+        seek_clause = f"AND {seek_clause}"
+    return Database.fetch_all(
+        f"""SELECT {columns}
+            FROM Historique
+            WHERE idUtilisateur = %s {seek_clause}
+            ORDER BY date_predit DESC, idHistorique DESC
+            LIMIT %s""",
+        tuple([user_id] + seek_params + [limit])
+    )
+
+
+def list_history(user_id: int, limit: int = 50, cursor: Optional[str] = None) -> tuple:
+    """Une page de l'historique, du plus récent au plus ancien ; renvoie (lignes, next_cursor)."""
+    after = _decode_cursor(cursor, 2) if cursor else None
+    rows = _fetch_page(user_id, HISTORY_LIST_COLUMNS, limit + 1, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor([rows[-1]["date_predit"], rows[-1]["idHistorique"]])
+    return [_format_row(row) for row in rows], next_cursor
+
+
+def get_history_entry(user_id: int, history_id: int) -> dict:
+    row = Database.fetch_one(
+        "SELECT * FROM Historique WHERE idHistorique = %s AND idUtilisateur = %s",
+        (history_id, user_id)
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="History entry not found")
+    return _format_row(row)
+
+
+def iter_history(user_id: int, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Toutes les lignes complètes de l'utilisateur, lues par pages (mémoire bornée)."""
+    after = None
+    while True:
+        rows = _fetch_page(user_id, "*", chunk_size, after)
+        if not rows:
+            return
+        after = [rows[-1]["date_predit"], rows[-1]["idHistorique"]]
+        for row in rows:
+            yield _format_row(row)
+        if len(rows) < chunk_size:
+            return
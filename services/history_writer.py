@@ -0,0 +1,207 @@
+from mysql.connector.errors import DataError, IntegrityError
+from database import Database
+from services.history_service import HISTORIQUE_INSERT
+from services.metrics import registry, BATCH_SIZE_BUCKETS
+from services.log import get_logger
+from services.spool import process_spool_path, adopt_orphan_spools, append_lines, read_lines, rewrite_lines
+import os
+import threading
+import time
+
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_MS = float(os.getenv("HISTORY_FLUSH_MS", "200"))
+# Lignes en mémoire au plus ; au-delà elles vont directement dans le fichier de secours
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_MAX_BACKOFF_SECONDS = float(os.getenv("HISTORY_MAX_BACKOFF_SECONDS", "60"))
+# Chaque worker écrit history_spool.<pid>.jsonl (services/spool.py) ; les lignes
+# refusées par la base (trop longues, contrainte violée) vont dans history_spool.quarantine.jsonl
+HISTORY_SPOOL_PATH = os.getenv(
+    "HISTORY_SPOOL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "history_spool.jsonl")
+)
+HISTORY_ADOPT_SECONDS = float(os.getenv("HISTORY_ADOPT_SECONDS", "60"))
+
+INSERT_SECONDS = registry.histogram("predisalaire_history_insert_seconds", "Insertion d'un lot d'historique (executemany)")
+INSERT_ROWS = registry.histogram("predisalaire_history_insert_rows", "Lignes par lot d'historique inséré",
+                                 buckets=BATCH_SIZE_BUCKETS)
+
+logger = get_logger("history")
+
+
+class HistoryWriter:
+    """
+    Écrit l'historique des prédictions hors du chemin de la requête : les
+    lignes sont mises en file et insérées par lots (executemany) dès que
+    HISTORY_BATCH_SIZE lignes attendent ou toutes les HISTORY_FLUSH_MS ms.
+    Si la base est indisponible, les lots sont écrits (fsync) dans un fichier
+    JSONL, réinsérés en priorité dès que la base répond de nouveau. Un lot
+    refusé pour ses données est réinséré ligne par ligne : seules les lignes
+    fautives sont mises en quarantaine, les autres ne bloquent pas la file.
+    """
+
+    def __init__(self, query: str = HISTORIQUE_INSERT, path: str = HISTORY_SPOOL_PATH,
+                 batch_size: int = HISTORY_BATCH_SIZE, flush_ms: float = HISTORY_FLUSH_MS,
+                 max_queue: int = HISTORY_QUEUE_SIZE):
+        self.query = query
+        self.shared_path = os.path.abspath(path)
+        self.path = process_spool_path(path)
+        root, ext = os.path.splitext(self.shared_path)
+        self.quarantine_path = f"{root}.quarantine{ext}"
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self.max_queue = max_queue
+        self._rows = []
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._backoff = 0.0
+        self._adopted_at = None
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "spooled": 0, "recovered": 0,
+                      "quarantined": 0, "errors": 0, "last_flush_ms": None, "max_flush_ms": None, "total_flush_ms": 0.0}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, rows: list):
+        """Met des lignes (tuples de HISTORIQUE_INSERT) en file ; ne touche pas à la base."""
+        if not rows:
+            return
+        self.start()
+        with self._lock:
+            room = max(0, self.max_queue - len(self._rows))
+            accepted, overflow = rows[:room], rows[room:]
+            self._rows.extend(accepted)
+            self.stats["enqueued"] += len(rows)
+            if len(self._rows) >= self.batch_size and not self._backoff:
+                self._wake.set()
+        if overflow:
+            # File pleine (base lente ou en panne) : sur disque plutôt que perdues
+            self._spool(overflow)
+
+    # --- fichier de secours ---
+    def _spool(self, rows: list):
+        # Fichier de ce seul processus : _spool_lock suffit entre ses threads
+        with self._spool_lock:
+            append_lines(self.path, [list(row) for row in rows])
+        with self._lock:
+            self.stats["spooled"] += len(rows)
+
+    def _drain_spool(self):
+        with self._spool_lock:
+            if self._adopted_at is None or time.monotonic() - self._adopted_at >= HISTORY_ADOPT_SECONDS:
+                # Fichiers des workers arrêtés (et ancien fichier commun)
+                adopt_orphan_spools(self.shared_path, self.path)
+                self._adopted_at = time.monotonic()
+            rows = [tuple(row) for row in read_lines(self.path)]
+            done = 0
+            try:
+                while done < len(rows):
+                    batch = rows[done:done + self.batch_size]
+                    self._write(batch)
+                    done += len(batch)
+            finally:
+                if done:
+                    rewrite_lines(self.path, [list(row) for row in rows[done:]])
+                    with self._lock:
+                        self.stats["recovered"] += done
+                    logger.info("spool_recovered", rows=done)
+
+    def _quarantine(self, row: tuple, error: Exception):
+        append_lines(self.quarantine_path, [{"row": list(row), "error": str(error)}])
+        with self._lock:
+            self.stats["quarantined"] += 1
+        logger.error("row_quarantined", path=self.quarantine_path, error=error)
+
+    # --- écriture ---
+    def _insert(self, batch: list):
+        started = time.perf_counter()
+        Database.execute_many(self.query, batch)
+        elapsed = (time.perf_counter() - started) * 1000
+        INSERT_SECONDS.observe(elapsed / 1000)
+        INSERT_ROWS.observe(len(batch))
+        with self._lock:
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["last_flush_ms"] = round(elapsed, 1)
+            self.stats["max_flush_ms"] = round(max(elapsed, self.stats["max_flush_ms"] or 0), 1)
+            self.stats["total_flush_ms"] += elapsed
+
+    def _write(self, batch: list):
+        """
+        Insère un lot ; si la base refuse les données, réessaie ligne par ligne
+        et met en quarantaine les lignes refusées. Les autres erreurs (base
+        indisponible) remontent.
+        """
+        try:
+            self._insert(batch)
+            return
+        except (DataError, IntegrityError) as e:
+            if len(batch) == 1:
+                self._quarantine(batch[0], e)
+                return
+        for row in batch:
+            try:
+                self._insert([row])
+            except (DataError, IntegrityError) as e:
+                self._quarantine(row, e)
+
+    def flush(self):
+        """Vide la file en base ; en cas d'échec, le lot en cours part dans le fichier et l'erreur remonte."""
+        self._drain_spool()
+        while True:
+            with self._lock:
+                batch = self._rows[:self.batch_size]
+                del self._rows[:len(batch)]
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                with self._lock:
+                    rest, self._rows = self._rows, []
+                self._spool(batch + rest)
+                raise
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._backoff or self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                self._backoff = 0.0
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                self._backoff = min(HISTORY_MAX_BACKOFF_SECONDS, max(1.0, self._backoff * 2))
+                logger.error("insert_failed", error=e, retry_in=self._backoff)
+            if self._stopping:
+                return
+
+    def stop(self, timeout: float = 10.0):
+        """Dernier envoi ; ce qui ne passe pas reste dans le fichier de secours."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping = True
+        self._backoff = 0.0
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._rows)
+        total = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = round(total / stats["batches"], 1) if stats["batches"] else None
+        stats["backoff_seconds"] = self._backoff
+        return stats
+
+
+history_writer = HistoryWriter()
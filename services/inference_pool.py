@@ -0,0 +1,190 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+import multiprocessing
+import os
+import threading
+import numpy as np
+from services.log import get_logger
+
+# "thread" : prédiction dans le worker uvicorn ; "process" : pool de processus dédiés
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Lots en cours au plus ; au-delà la prédiction se fait dans le processus appelant
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", str(INFERENCE_WORKERS * 4)))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "10"))
+# Threads XGBoost / OpenMP par processus : le parallélisme vient du pool
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "1"))
+
+# --- côté processus du pool ---
+# Versions déjà rechargées sans succès : pas de rechargement à chaque lot
+_tried_versions = set()
+
+logger = get_logger("inference")
+
+
+def _worker_init(threads: int):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from services import prediction_service
+    prediction_service.warm_up_model()
+    _limit_threads(prediction_service._active_model()[0], threads)
+
+
+def _limit_threads(model, threads: int):
+    booster = getattr(model, "booster", None)
+    if booster is None and getattr(model, "steps", None):
+        booster = model.steps[-1][1].get_booster()
+    if booster is not None:
+        booster.set_param({"nthread": threads})
+
+
+def _worker_predict(version: str, columns: tuple, values: List[list]) -> tuple:
+    """Prédit un lot transmis par colonnes ; renvoie (version du modèle, tableau float64 ou None)."""
+    from services import prediction_service
+    model, current = prediction_service._active_model()
+    if current != version and version not in _tried_versions:
+        # Le processus parent a rechargé le modèle : on suit
+        _tried_versions.add(version)
+        try:
+            prediction_service.reload_model()
+            model, current = prediction_service._active_model()
+            _limit_threads(model, INFERENCE_WORKER_THREADS)
+        except Exception as e:
+            logger.error("worker_reload_failed", error=e)
+    if model is None or current != version:
+        return current, None
+    rows = [dict(zip(columns, row)) for row in zip(*values)]
+    return current, np.asarray(prediction_service._model_predict(model, rows), dtype=np.float64)
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+# --- côté worker uvicorn ---
+class InferencePool:
+    """
+    Pool borné de processus qui chargent chacun le modèle une fois. Les lots
+    circulent par colonnes (listes de textes) et reviennent en tableau
+    float64. Quand INFERENCE_MAX_PENDING lots sont déjà en cours, ou si le
+    pool est indisponible, predict() renvoie None et l'appelant prédit
+    lui-même.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, max_pending: int = INFERENCE_MAX_PENDING,
+                 threads: int = INFERENCE_WORKER_THREADS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.threads = threads
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"batches": 0, "rows": 0, "saturated": 0, "errors": 0, "version_mismatch": 0, "restarts": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn : pas de fork d'un processus qui a déjà des threads (uvicorn, OpenMP)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_worker_init, initargs=(self.threads,)
+                )
+            return self._executor
+
+    def start(self, timeout: float = 120.0):
+        """Démarre les processus et attend qu'ils aient chargé le modèle."""
+        executor = self._get_executor()
+        for future in [executor.submit(_worker_ping) for _ in range(self.workers)]:
+            future.result(timeout=timeout)
+        logger.info("pool_ready", workers=self.workers)
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def predict(self, version: str, rows: List[dict]) -> Optional[List[float]]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["saturated"] += 1
+                return None
+            self._pending += 1
+
+        columns = tuple(rows[0].keys())
+        values = [[row[column] for row in rows] for column in columns]
+        try:
+            future = self._get_executor().submit(_worker_predict, version, columns, values)
+        except Exception as e:
+            self._done(None)
+            self._reset(e)
+            return None
+        future.add_done_callback(self._done)
+
+        try:
+            current, predictions = future.result(timeout=INFERENCE_TIMEOUT)
+        except BrokenProcessPool as e:
+            self._reset(e)
+            return None
+        except FutureTimeoutError:
+            self._count("errors")
+            logger.error("batch_timeout", rows=len(rows))
+            return None
+        except Exception as e:
+            self._count("errors")
+            logger.error("worker_failed", error=e)
+            return None
+
+        if predictions is None:
+            self._count("version_mismatch")
+            return None
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(rows)
+        return predictions.tolist()
+
+    def _reset(self, error: Exception):
+        # Processus tué (OOM...) : le pool sera recréé au prochain lot
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.stats["errors"] += 1
+            self.stats["restarts"] += 1
+        logger.error("pool_broken", error=error)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = self._pending
+        stats.update({"backend": "process", "workers": self.workers, "max_pending": self.max_pending})
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool() -> Optional[InferencePool]:
+    """Pool partagé du worker, ou None quand INFERENCE_BACKEND n'est pas "process"."""
+    global _pool
+    if INFERENCE_BACKEND != "process":
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InferencePool()
+    return _pool
+
+
+def get_inference_stats() -> dict:
+    pool = get_inference_pool()
+    return pool.get_stats() if pool is not None else {"backend": INFERENCE_BACKEND}
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+import sys
+
+# DEBUG, INFO, WARNING, ERROR ou OFF (aucune écriture, même pas le formatage)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" : `niveau logger événement clé=valeur` ; "json" : une ligne JSON par événement
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+_ROOT = "predisalaire"
+
+
+class _StructuredFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if LOG_FORMAT == "json":
+            entry = {"time": self.formatTime(record), "level": record.levelname, "logger": record.name,
+                     "event": record.getMessage(), **fields}
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = f"{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def _configure() -> logging.Logger:
+    root = logging.getLogger(_ROOT)
+    # Indépendant de la configuration de uvicorn
+    root.propagate = False
+    if LOG_LEVEL == "OFF":
+        root.setLevel(logging.CRITICAL + 1)
+        root.addHandler(logging.NullHandler())
+        return root
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(_StructuredFormatter())
+    root.addHandler(handler)
+    return root
+
+
+_configure()
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    logger.info("prediction", salaire=42000.0) : les champs nommés sont
+    ajoutés à la ligne (texte ou JSON). Sous le niveau configuré, l'appel
+    s'arrête à isEnabledFor, sans formatage.
+    """
+
+    def process(self, msg, kwargs):
+        extra = {key: kwargs.pop(key) for key in list(kwargs) if key not in ("exc_info", "stack_info", "stacklevel")}
+        kwargs["extra"] = {"fields": extra}
+        return msg, kwargs
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(f"{_ROOT}.{name}"), {})
@@ -0,0 +1,235 @@
+from datetime import datetime
+from itertools import product
+from typing import Optional, List
+from fastapi import HTTPException
+import os
+import threading
+import numpy as np
+from database import Database
+from services.search_service import OFFRE_JOINS
+from services.log import get_logger
+
+MARKET_STATS_REFRESH_SECONDS = float(os.getenv("MARKET_STATS_REFRESH_SECONDS", "300"))
+# Une reconstruction complète toutes les N mises à jour (offres modifiées ou supprimées)
+MARKET_STATS_FULL_EVERY = int(os.getenv("MARKET_STATS_FULL_EVERY", "12"))
+MARKET_STATS_PAGE_SIZE = int(os.getenv("MARKET_STATS_PAGE_SIZE", "50000"))
+
+DIMENSIONS = ("metier", "region", "experience")
+# Valeur d'une dimension agrégée (toutes les valeurs confondues) dans une clé de groupe
+ALL = "*"
+PERCENTILES = (10, 25, 50, 75, 90)
+
+CUBE_QUERY = f"""SELECT o.idOffre, o.idMetier, m.libelle as metier, d.idRegion, r.region,
+           o.idExperience, e.libelle as experience, s.salaire_avg
+    FROM Offre o
+    JOIN Salaire s ON o.idsalaire = s.idsalaire
+    {OFFRE_JOINS["m"]}
+    {OFFRE_JOINS["e"]}
+    {OFFRE_JOINS["d"]}
+    {OFFRE_JOINS["r"]}
+    WHERE s.salaire_avg IS NOT NULL AND o.idOffre > %s
+    ORDER BY o.idOffre
+    LIMIT %s"""
+
+logger = get_logger("market")
+
+
+def _summary(values: np.ndarray) -> dict:
+    p10, p25, median, p75, p90 = (round(float(v), 2) for v in np.percentile(values, PERCENTILES))
+    return {
+        "count": int(values.size),
+        "min": round(float(values.min()), 2),
+        "p10": p10,
+        "p25": p25,
+        "median": median,
+        "p75": p75,
+        "p90": p90,
+        "max": round(float(values.max()), 2),
+        "mean": round(float(values.mean()), 2),
+    }
+
+
+def _rollups(cell: tuple) -> list:
+    """Les 8 groupes (cellule, marges, total) auxquels contribue une cellule (metier, region, experience)."""
+    return list(product(*((value, ALL) for value in cell)))
+
+
+class _MarketCube:
+    """
+    Cube en mémoire des salaires moyens des offres par (métier, région,
+    expérience). Chaque cellule garde ses valeurs ; les statistiques de tous
+    les groupes (cellules, marges et total) sont précalculées, une requête est
+    donc une simple lecture. Les mises à jour n'ajoutent que les offres
+    d'identifiant supérieur au dernier vu et ne recalculent que les groupes
+    touchés ; une reconstruction complète reprend les offres modifiées.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._summaries = {}
+        self._labels = {name: {} for name in DIMENSIONS}
+        self._last_id = 0
+        self._refreshes = 0
+        self.refreshed_at = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    def refresh(self, full: bool = False) -> dict:
+        full = full or not self.ready or (MARKET_STATS_FULL_EVERY > 0 and self._refreshes % MARKET_STATS_FULL_EVERY == 0)
+        last_id = 0 if full else self._last_id
+        new_values = {}
+        labels = {name: {} for name in DIMENSIONS}
+        rows_read = 0
+
+        while True:
+            rows = Database.fetch_all(CUBE_QUERY, (last_id, MARKET_STATS_PAGE_SIZE))
+            for row in rows:
+                cell = (row["idMetier"], row["idRegion"], row["idExperience"])
+                new_values.setdefault(cell, []).append(float(row["salaire_avg"]))
+                labels["metier"][row["idMetier"]] = row["metier"]
+                labels["region"][row["idRegion"]] = row["region"]
+                labels["experience"][row["idExperience"]] = row["experience"]
+            rows_read += len(rows)
+            if rows:
+                last_id = rows[-1]["idOffre"]
+            if len(rows) < MARKET_STATS_PAGE_SIZE:
+                break
+
+        # Calcul hors verrou (les mises à jour sont sérialisées par _refresh_lock) :
+        # les lectures continuent sur l'ancien cube jusqu'à l'échange final
+        cells = {} if full else dict(self._cells)
+        for cell, values in new_values.items():
+            added = np.asarray(values, dtype=np.float64)
+            cells[cell] = np.concatenate([cells[cell], added]) if cell in cells else added
+
+        if full:
+            touched = {group for cell in cells for group in _rollups(cell)}
+            summaries = {}
+        else:
+            touched = {group for cell in new_values for group in _rollups(cell)}
+            summaries = dict(self._summaries)
+
+        members = {}
+        for cell, values in cells.items():
+            for group in _rollups(cell):
+                if group in touched:
+                    members.setdefault(group, []).append(values)
+        for group, arrays in members.items():
+            summaries[group] = _summary(np.concatenate(arrays))
+
+        if not full:
+            for name in DIMENSIONS:
+                labels[name] = {**self._labels[name], **labels[name]}
+
+        with self._lock:
+            self._cells = cells
+            self._summaries = summaries
+            self._labels = labels
+            self._last_id = last_id
+            self._refreshes += 1
+            self.refreshed_at = datetime.utcnow()
+
+        return {"full": full, "rows": rows_read, "groups_updated": len(members), "groups": len(summaries)}
+
+    def _check_ready(self):
+        if not self.ready:
+            raise HTTPException(status_code=503, detail="Market statistics not ready")
+
+    def _entry(self, group: tuple) -> dict:
+        entry = {}
+        for name, value in zip(DIMENSIONS, group):
+            if value != ALL:
+                entry[f"{name}_id"] = value
+                entry[name] = self._labels[name].get(value)
+        entry.update(self._summaries[group])
+        return entry
+
+    def get(self, metier_id: Optional[int], region_id: Optional[int], experience_id: Optional[int]) -> dict:
+        self._check_ready()
+        group = tuple(ALL if value is None else value for value in (metier_id, region_id, experience_id))
+        with self._lock:
+            if group in self._summaries:
+                return self._entry(group)
+        return {"count": 0}
+
+    def breakdown(self, by: List[str], filters: dict) -> list:
+        """Groupes détaillés selon les dimensions `by`, restreints aux valeurs de `filters`."""
+        self._check_ready()
+        with self._lock:
+            entries = []
+            for group in self._summaries:
+                keep = True
+                for name, value in zip(DIMENSIONS, group):
+                    if name in by:
+                        keep = value != ALL and (filters.get(name) is None or value == filters[name])
+                    else:
+                        keep = value == (ALL if filters.get(name) is None else filters[name])
+                    if not keep:
+                        break
+                if keep:
+                    entries.append(self._entry(group))
+        return sorted(entries, key=lambda entry: -entry["count"])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+                "cells": len(self._cells),
+                "groups": len(self._summaries),
+                "offres": int(sum(values.size for values in self._cells.values())),
+                "last_offre_id": self._last_id,
+            }
+
+
+_cube = _MarketCube()
+_refresh_lock = threading.Lock()
+_stop = threading.Event()
+
+
+def refresh_market_stats(full: bool = False) -> dict:
+    # Une seule mise à jour à la fois (planifiée ou demandée par un admin)
+    with _refresh_lock:
+        return _cube.refresh(full)
+
+
+def get_salary_stats(metier_id: Optional[int] = None, region_id: Optional[int] = None,
+                     experience_id: Optional[int] = None) -> dict:
+    return _cube.get(metier_id, region_id, experience_id)
+
+
+def get_salary_breakdown(by: List[str], metier_id: Optional[int] = None, region_id: Optional[int] = None,
+                         experience_id: Optional[int] = None) -> list:
+    unknown = [name for name in by if name not in DIMENSIONS]
+    if not by or unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid breakdown, expected one of {', '.join(DIMENSIONS)}")
+    return _cube.breakdown(by, {"metier": metier_id, "region": region_id, "experience": experience_id})
+
+
+def get_market_stats_info() -> dict:
+    return _cube.get_stats()
+
+
+def start_market_stats_refresher(interval: float = MARKET_STATS_REFRESH_SECONDS):
+    """Construit le cube en arrière-plan puis le met à jour toutes les `interval` secondes."""
+    def run():
+        while True:
+            try:
+                result = refresh_market_stats()
+                logger.debug("cube_refreshed", **result)
+            except Exception as e:
+                logger.error("refresh_failed", error=e)
+            if _stop.wait(interval):
+                return
+
+    if interval <= 0:
+        return
+    _stop.clear()
+    threading.Thread(target=run, name="market-stats", daemon=True).start()
+
+
+def stop_market_stats_refresher():
+    _stop.set()
@@ -0,0 +1,202 @@
+"""
+Format exporté du modèle de salaire : un dossier contenant
+
+    manifest.json        paramètres du prétraitement, version, fichiers
+    booster.ubj          XGBoost au format natif (UBJSON, ou booster.json)
+    vocab_terms.npy      termes du TF-IDF (texte à largeur fixe)
+    vocab_columns.npy    colonne de chaque terme
+    idf.npy              poids idf par colonne
+    stop_words.npy       mots vides appliqués avant les n-grammes
+    cat_<colonne>.npy    catégories du one-hot, dans l'ordre des colonnes
+
+Les tableaux sont ouverts en mmap (lecture seule, sans pickle) : les pages
+sont partagées par tous les workers d'une même machine. Le chargement
+n'importe ni pickle ni scikit-learn ; les prédictions sont identiques à
+celles du Pipeline d'origine (même prétraitement, même appel inplace_predict).
+"""
+import json
+import math
+import os
+import re
+from typing import List
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def _save_array(directory: str, name: str, values) -> str:
+    filename = f"{name}.npy"
+    np.save(os.path.join(directory, filename), values, allow_pickle=False)
+    return filename
+
+
+def _unsupported(preprocessor) -> List[str]:
+    """Réglages que ExportedSalaryModel.transform ne reproduit pas à l'identique."""
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    if set(transformers) - {"remainder"} != {"txt", "cat"} or transformers.get("remainder", ("drop",))[0] != "drop":
+        return ["transformers other than txt + cat"]
+    tfidf, text_column = transformers["txt"]
+    onehot, _ = transformers["cat"]
+    indices = preprocessor.output_indices_
+    checks = {
+        "txt columns first": indices["txt"].start == 0 and indices["cat"].start == indices["txt"].stop,
+        "single text column": isinstance(text_column, str),
+        "analyzer='word'": tfidf.analyzer == "word",
+        "no custom tokenizer/preprocessor": tfidf.tokenizer is None and tfidf.preprocessor is None,
+        "strip_accents=None": tfidf.strip_accents is None,
+        "binary=False": not tfidf.binary,
+        "use_idf=True": tfidf.use_idf,
+        "sublinear_tf=False": not tfidf.sublinear_tf,
+        "norm='l2'": tfidf.norm == "l2",
+        "drop=None": onehot.drop is None,
+        "handle_unknown='ignore'": onehot.handle_unknown == "ignore",
+        "no infrequent categories": not getattr(onehot, "_infrequent_enabled", False),
+    }
+    return [name for name, ok in checks.items() if not ok]
+
+
+def export_pipeline(pipeline, directory: str, version: str, source: str = None, booster_format: str = "ubj") -> dict:
+    """Exporte un Pipeline(ColumnTransformer(TfidfVectorizer, OneHotEncoder), XGBRegressor)."""
+    preprocessor, regressor = pipeline.steps[0][1], pipeline.steps[-1][1]
+    unsupported = _unsupported(preprocessor)
+    if unsupported:
+        raise ValueError(f"Unsupported pipeline configuration for export: {', '.join(unsupported)}")
+    transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+    tfidf, text_column = transformers["txt"]
+    onehot, cat_columns = transformers["cat"]
+
+    os.makedirs(directory, exist_ok=True)
+    terms = sorted(tfidf.vocabulary_, key=tfidf.vocabulary_.get)
+    stop_words = sorted(tfidf.get_stop_words() or [])
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "source": os.path.basename(source) if source else None,
+        "text_column": text_column,
+        "lowercase": tfidf.lowercase,
+        "token_pattern": tfidf.token_pattern,
+        "ngram_range": list(tfidf.ngram_range),
+        "n_text_features": len(terms),
+        "cat_columns": list(cat_columns),
+        "cat_offset": preprocessor.output_indices_["cat"].start,
+        "n_features": preprocessor.output_indices_["cat"].stop,
+        "files": {
+            "vocab_terms": _save_array(directory, "vocab_terms", np.array(terms, dtype=str)),
+            "vocab_columns": _save_array(directory, "vocab_columns",
+                                         np.array([tfidf.vocabulary_[t] for t in terms], dtype=np.int32)),
+            "idf": _save_array(directory, "idf", np.asarray(tfidf.idf_, dtype=np.float64)),
+            "stop_words": _save_array(directory, "stop_words", np.array(stop_words, dtype=str)),
+            "categories": [
+                _save_array(directory, f"cat_{column}", np.array([str(c) for c in categories], dtype=str))
+                for column, categories in zip(cat_columns, onehot.categories_)
+            ],
+        },
+    }
+    booster_file = f"booster.{booster_format}"
+    regressor.get_booster().save_model(os.path.join(directory, booster_file))
+    manifest["files"]["booster"] = booster_file
+    manifest["missing"] = None if regressor.missing is None or math.isnan(regressor.missing) else regressor.missing
+    # Arbres utilisés par XGBRegressor.predict : jusqu'à best_iteration après un early stopping
+    end = regressor._get_iteration_range(None)[1]
+    manifest["best_iteration"] = end - 1 if end else None
+
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version: {manifest.get('format_version')}")
+    return manifest
+
+
+class ExportedSalaryModel:
+    """Modèle chargé depuis un export ; predict() accepte le même DataFrame que le Pipeline."""
+
+    def __init__(self, directory: str):
+        import xgboost as xgb
+        self.directory = directory
+        self.manifest = manifest = read_manifest(directory)
+        files = manifest["files"]
+
+        def load(filename):
+            return np.load(os.path.join(directory, filename), mmap_mode="r", allow_pickle=False)
+
+        self.idf = load(files["idf"])
+        self.vocabulary = dict(zip(load(files["vocab_terms"]).tolist(), load(files["vocab_columns"]).tolist()))
+        self.stop_words = frozenset(load(files["stop_words"]).tolist())
+        self.token_pattern = re.compile(manifest["token_pattern"])
+        self.lowercase = manifest["lowercase"]
+        self.min_n, self.max_n = manifest["ngram_range"]
+        self.text_column = manifest["text_column"]
+        self.n_features = manifest["n_features"]
+        self.missing = np.nan if manifest["missing"] is None else manifest["missing"]
+        best_iteration = manifest.get("best_iteration")
+        self.iteration_range = (0, 0) if best_iteration is None else (0, best_iteration + 1)
+
+        # Index global de chaque catégorie : colonnes du one-hot à la suite du TF-IDF
+        self.categories = []
+        offset = manifest["cat_offset"]
+        for column, filename in zip(manifest["cat_columns"], files["categories"]):
+            values = load(filename).tolist()
+            self.categories.append((column, {value: offset + i for i, value in enumerate(values)}))
+            offset += len(values)
+
+        self.booster = xgb.Booster(model_file=os.path.join(directory, files["booster"]))
+
+    def _ngrams(self, text: str) -> List[str]:
+        # Même analyse que TfidfVectorizer (analyzer="word") : mots vides retirés avant les n-grammes
+        if self.lowercase:
+            text = text.lower()
+        tokens = [token for token in self.token_pattern.findall(text) if token not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+        grams = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, X):
+        """Matrice creuse (CSR, float64) identique à la sortie du ColumnTransformer."""
+        from scipy.sparse import csr_matrix
+
+        indptr, indices, data = [0], [], []
+        texts = X[self.text_column]
+        cat_values = [(X[column], mapping) for column, mapping in self.categories]
+        for row, text in enumerate(texts):
+            counts = {}
+            for gram in self._ngrams(text):
+                column = self.vocabulary.get(gram)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            columns = sorted(counts)
+            values = [counts[column] * float(self.idf[column]) for column in columns]
+            # Normalisation L2 dans l'ordre des colonnes, comme scikit-learn
+            norm = 0.0
+            for value in values:
+                norm += value * value
+            if norm != 0.0:
+                norm = math.sqrt(norm)
+                values = [value / norm for value in values]
+            indices.extend(columns)
+            data.extend(values)
+
+            for series, mapping in cat_values:
+                column = mapping.get(series.iloc[row] if hasattr(series, "iloc") else series[row])
+                if column is not None:
+                    indices.append(column)
+                    data.append(1.0)
+            indptr.append(len(indices))
+
+        return csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, self.n_features)
+        )
+
+    def predict(self, X) -> np.ndarray:
+        return self.booster.inplace_predict(self.transform(X), iteration_range=self.iteration_range,
+                                            missing=self.missing)
@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+from database import Database
+from services.log import get_logger
+
+# "memory" : un seul processus ; "mysql" : partagé entre workers et serveurs
+OTP_STORE = os.getenv("OTP_STORE", "memory")
+OTP_SWEEP_SECONDS = float(os.getenv("OTP_SWEEP_SECONDS", "60"))
+OTP_MEMORY_MAX_ENTRIES = int(os.getenv("OTP_MEMORY_MAX_ENTRIES", "100000"))
+
+logger = get_logger("otp")
+
+
+class OTPStore(ABC):
+    """
+    Codes à usage unique indexés par (purpose, email). Une entrée est un dict
+    {"code", "expires", "user_id", "attempts"} ; `expires` est en UTC naïf.
+    """
+
+    @abstractmethod
+    def put(self, purpose: str, email: str, code: str, ttl: timedelta, user_id: Optional[int] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, purpose: str, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def take_attempt(self, purpose: str, email: str, max_attempts: int) -> bool:
+        """
+        Décompte un essai si le code existe et en a encore (< max_attempts),
+        en une seule opération atomique ; renvoie False sinon.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, purpose: str, email: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Supprime les entrées expirées ; renvoie leur nombre."""
+        raise NotImplementedError
+
+    def start_sweeper(self, interval: float = OTP_SWEEP_SECONDS):
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    removed = self.sweep()
+                    if removed:
+                        logger.info("otp_swept", removed=removed)
+                except Exception as e:
+                    logger.error("otp_sweep_failed", error=e)
+
+        if getattr(self, "_sweeper", None) is not None and self._sweeper.is_alive():
+            return
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(target=run, name="otp-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if getattr(self, "_sweeper", None) is not None:
+            self._stop.set()
+
+
+class InMemoryOTPStore(OTPStore):
+    def __init__(self, max_entries: int = OTP_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, purpose, email, code, ttl, user_id=None):
+        key = (purpose, email)
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.max_entries:
+                self._sweep_locked()
+                # Toujours plein : on évince les codes les plus anciens
+                while len(self._data) >= self.max_entries:
+                    self._data.popitem(last=False)
+            self._data[key] = {
+                "code": code,
+                "expires": datetime.utcnow() + ttl,
+                "user_id": user_id,
+                "attempts": 0,
+            }
+
+    def get(self, purpose, email):
+        with self._lock:
+            entry = self._data.get((purpose, email))
+            return dict(entry) if entry else None
+
+    def take_attempt(self, purpose, email, max_attempts):
+        with self._lock:
+            entry = self._data.get((purpose, email))
+            if entry is None or entry["attempts"] >= max_attempts:
+                return False
+            entry["attempts"] += 1
+            return True
+
+    def delete(self, purpose, email):
+        with self._lock:
+            self._data.pop((purpose, email), None)
+
+    def _sweep_locked(self) -> int:
+        now = datetime.utcnow()
+        expired = [key for key, entry in self._data.items() if entry["expires"] < now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+
+    def sweep(self):
+        with self._lock:
+            return self._sweep_locked()
+
+
+class MySQLOTPStore(OTPStore):
+    """Table OtpCode (migrations/003_otp_codes.sql), partagée par tous les workers."""
+
+    def put(self, purpose, email, code, ttl, user_id=None):
+        Database.execute(
+            """INSERT INTO OtpCode (purpose, email, code, user_id, expires_at, attempts)
+               VALUES (%s, %s, %s, %s, %s, 0)
+               ON DUPLICATE KEY UPDATE code = VALUES(code), user_id = VALUES(user_id),
+                   expires_at = VALUES(expires_at), attempts = 0""",
+            (purpose, email, code, user_id, datetime.utcnow() + ttl)
+        )
+
+    def get(self, purpose, email):
+        row = Database.fetch_one(
+            "SELECT code, user_id, expires_at, attempts FROM OtpCode WHERE purpose = %s AND email = %s",
+            (purpose, email)
+        )
+        if not row:
+            return None
+        return {"code": row["code"], "expires": row["expires_at"], "user_id": row["user_id"], "attempts": row["attempts"]}
+
+    def take_attempt(self, purpose, email, max_attempts):
+        # Limite vérifiée par l'UPDATE lui-même (verrou de ligne) : deux workers
+        # ne peuvent pas obtenir le même dernier essai
+        return Database.execute_rowcount(
+            "UPDATE OtpCode SET attempts = attempts + 1 WHERE purpose = %s AND email = %s AND attempts < %s",
+            (purpose, email, max_attempts)
+        ) == 1
+
+    def delete(self, purpose, email):
+        Database.execute("DELETE FROM OtpCode WHERE purpose = %s AND email = %s", (purpose, email))
+
+    def sweep(self):
+        return Database.execute_rowcount("DELETE FROM OtpCode WHERE expires_at < %s", (datetime.utcnow(),))
+
+
+def create_otp_store(kind: str = OTP_STORE) -> OTPStore:
+    if kind == "mysql":
+        return MySQLOTPStore()
+    if kind == "memory":
+        return InMemoryOTPStore()
+    raise ValueError(f"Unknown OTP_STORE: {kind}")
+
+
+otp_store = create_otp_store()
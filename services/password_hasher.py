@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from fastapi import HTTPException
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from services.log import get_logger
+
+# Coût scrypt : ~128 * N * r octets de mémoire par hachage (32 Mo par défaut)
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 15)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Hachages simultanés au plus : une rafale de logins ne prend pas tous les cœurs
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Au-delà de ce nombre de hachages en attente, on répond 503 plutôt que de bloquer.
+# Chaque hachage en attente bloque un thread du threadpool AnyIO (40 par défaut,
+# partagés avec les prédictions) : la borne doit rester bien en dessous
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+
+logger = get_logger("auth")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+
+def hash_password_sync(password: str) -> str:
+    """Hachage au format "scrypt$N$r$p$sel$empreinte" (base64 sans padding)."""
+    salt = os.urandom(SALT_BYTES)
+    n, r, p = PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    if not hashed:
+        return False
+    if hashed.startswith(SCHEME + "$"):
+        try:
+            _, n, r, p, salt, digest = hashed.split("$")
+            expected = _unb64(digest)
+            actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(actual, expected)
+    # Ancien format : SHA-256 hexadécimal sans sel
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Vrai pour les anciens hachages SHA-256 et ceux d'un coût différent du coût courant."""
+    current = f"{SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    return not hashed or not hashed.startswith(current)
+
+
+class PasswordHasher:
+    """
+    Exécute le KDF dans un pool de threads dédié et borné (hashlib.scrypt
+    libère le GIL). Les appels restent synchrones pour les routes et
+    bloquent donc un thread du threadpool : au-delà de PASSWORD_HASH_QUEUE
+    hachages en attente, la requête échoue en 503 au lieu d'occuper les
+    threads partagés avec les prédictions.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_QUEUE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HTTPException(status_code=503, detail="Server busy, please retry")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-kdf")
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        try:
+            return self._submit(fn, *args).result(timeout=PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+    def hash(self, password: str) -> str:
+        hashed = self._run(hash_password_sync, password)
+        self._count("hashed")
+        return hashed
+
+    def verify(self, password: str, hashed: str) -> bool:
+        ok = self._run(verify_password_sync, password, hashed)
+        self._count("verified")
+        return ok
+
+    def rehash_in_background(self, password: str, save) -> bool:
+        """Calcule le nouveau hachage hors requête puis appelle save(hachage)."""
+        def run():
+            try:
+                save(hash_password_sync(password))
+                self._count("rehashed")
+            except Exception as e:
+                logger.error("rehash_failed", error=e)
+
+        try:
+            self._submit(run)
+        except HTTPException:
+            # Pool saturé : ce sera pour la prochaine connexion
+            return False
+        return True
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = self._pending
+        stats["workers"] = self.workers
+        stats["scheme"] = f"{SCHEME}$N={PASSWORD_SCRYPT_N},r={PASSWORD_SCRYPT_R},p={PASSWORD_SCRYPT_P}"
+        return stats
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from typing import List, Optional
+
+from services.log import get_logger
+from services.metrics import BATCH_SIZE_BUCKETS
+from services.prediction_service import predict_salary, predict_salaries
+from services.request_timing import record_timing, start_request
+
+# Fenêtre de regroupement des requêtes concurrentes (0 = désactivé)
+COALESCE_WINDOW_MS = float(os.getenv("PREDICT_COALESCE_WINDOW_MS", "3"))
+COALESCE_MAX_BATCH = int(os.getenv("PREDICT_COALESCE_MAX_BATCH", "32"))
+# Attente maximale d'un résultat regroupé ; au-delà, prédiction directe dans le thread appelant
+COALESCE_TIMEOUT_MS = float(os.getenv("PREDICT_COALESCE_TIMEOUT_MS", "2000"))
+
+logger = get_logger("prediction_batcher")
+
+
+class PredictionBatcher:
+    """
+    Regroupe les appels predict_salary concurrents arrivant dans une même
+    fenêtre de temps en un seul appel vectorisé à predict_salaries.
+    Les handlers (threadpool FastAPI) attendent leur résultat sur un Future.
+    """
+
+    def __init__(self, window_ms: float = COALESCE_WINDOW_MS, max_batch_size: int = COALESCE_MAX_BATCH,
+                 timeout_ms: float = COALESCE_TIMEOUT_MS):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout = timeout_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._recent_waits = deque(maxlen=1000)
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "batch_size_buckets": {b: 0 for b in BATCH_SIZE_BUCKETS},
+            "queue_wait_total_ms": 0.0,
+            "queue_wait_max_ms": 0.0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, **kwargs) -> dict:
+        self._ensure_started()
+        future = Future()
+        enqueued = time.perf_counter()
+        self._queue.put((kwargs, future, enqueued))
+        try:
+            result, started, timings = future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Thread de regroupement bloqué ou en retard : la requête ne l'attend plus
+            future.cancel()
+            with self._stats_lock:
+                self._stats["timeouts"] += 1
+            logger.warning("coalesce_timeout", timeout_ms=self.timeout * 1000)
+            return predict_salary(**kwargs)
+        # Durées mesurées dans le thread de regroupement (hors contexte de la
+        # requête) : reportées dans le Server-Timing de chaque requête du lot
+        record_timing("coalesce", started - enqueued)
+        for name, (seconds, _) in timings.items():
+            record_timing(name, seconds)
+        return result
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _record(self, batch: list, started: float):
+        waits = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        size = len(batch)
+        with self._stats_lock:
+            self._stats["requests"] += size
+            self._stats["batches"] += 1
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], size)
+            for bucket in BATCH_SIZE_BUCKETS:
+                if size <= bucket:
+                    self._stats["batch_size_buckets"][bucket] += 1
+                    break
+            self._stats["queue_wait_total_ms"] += sum(waits)
+            self._stats["queue_wait_max_ms"] = max(self._stats["queue_wait_max_ms"], max(waits))
+            self._recent_waits.extend(waits)
+
+    def _run(self):
+        while True:
+            batch = []
+            timings = start_request()
+            # Toute erreur est renvoyée aux appelants : le thread ne doit jamais s'arrêter
+            try:
+                batch = self._collect()
+                started = time.perf_counter()
+                self._record(batch, started)
+                # Les appelants partis sur timeout ont annulé leur Future
+                batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                results = predict_salaries([kwargs for kwargs, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result((result, started, timings))
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                logger.error("coalesce_batch_failed", size=len(batch), error=e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["batch_size_buckets"] = dict(self._stats["batch_size_buckets"])
+            waits = sorted(self._recent_waits)
+        stats["window_ms"] = self.window * 1000
+        stats["max_batch"] = self.max_batch_size
+        stats["timeout_ms"] = self.timeout * 1000
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0
+        stats["queue_wait_avg_ms"] = round(stats["queue_wait_total_ms"] / stats["requests"], 3) if stats["requests"] else 0
+        stats["queue_wait_p50_ms"] = round(_percentile(waits, 50), 3)
+        stats["queue_wait_p99_ms"] = round(_percentile(waits, 99), 3)
+        return stats
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+_batcher: Optional[PredictionBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> Optional[PredictionBatcher]:
+    global _batcher
+    if COALESCE_WINDOW_MS <= 0:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = PredictionBatcher()
+    return _batcher
+
+
+def predict_salary_coalesced(**kwargs) -> dict:
+    """Même contrat que predict_salary, mais regroupé avec les requêtes concurrentes."""
+    batcher = get_batcher()
+    if batcher is None:
+        return predict_salary(**kwargs)
+    return batcher.submit(**kwargs)
@@ -1,13 +1,63 @@
 import pickle
 import os
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from typing import Optional, List
+import numpy as np
 import pandas as pd
 import warnings
+from services.inference_pool import get_inference_pool
+from services.log import get_logger
+from services.metrics import registry, BATCH_SIZE_BUCKETS
+from services.request_timing import record_timing
 
 warnings.filterwarnings('ignore')
 
+logger = get_logger("prediction")
+
+FEATURE_EXTRACTION_SECONDS = registry.histogram(
+    "predisalaire_feature_extraction_seconds", "Extraction des compétences et du niveau d'une offre")
+INFERENCE_SECONDS = registry.histogram(
+    "predisalaire_inference_seconds", "Appel du modèle pour un lot", ("backend",))
+INFERENCE_ROWS = registry.histogram(
+    "predisalaire_inference_rows", "Offres par appel du modèle", buckets=BATCH_SIZE_BUCKETS)
+PREDICTIONS = registry.counter(
+    "predisalaire_predictions_total", "Prédictions servies, par origine (model, cache, fallback)", ("source",))
+FALLBACKS = registry.counter(
+    "predisalaire_prediction_fallbacks_total", "Prédictions heuristiques (model_used=False)", ("reason",))
+ERRORS = registry.counter(
+    "predisalaire_prediction_errors_total", "Erreurs du chemin de prédiction", ("stage",))
+MODEL_INFO = registry.gauge(
+    "predisalaire_model_info", "Modèle en service (1 pour la version active)", ("version", "format"))
+
+# "auto" : modèle exporté (mmap, sans pickle) s'il est présent et à jour, sinon le pickle ;
+# "pickle" ou "exported" pour forcer un format
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+MODEL_EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR")
+# Délai avant une nouvelle tentative après un échec de chargement
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "60"))
+
 _model = None
 _model_loaded = False
+_model_info = {"version": None, "path": None, "loaded_at": None, "error": None, "ready": False}
+_model_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_last_load_attempt = None
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "2048"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+
+WARMUP_SAMPLE = {
+    "titre": "Développeur Python",
+    "description": "Développeur Python senior, Docker, AWS et SQL, 5 ans d'expérience",
+    "metier": "",
+    "region": "Île-de-France",
+}
 
 
 def _get_model_path():
@@ -23,45 +73,277 @@ def _get_model_path():
     for path in possible_paths:
         abs_path = os.path.abspath(path)
         if os.path.exists(abs_path):
-            print(f"[DEBUG] Found model at: {abs_path}")
+            logger.debug("model_found", path=abs_path)
             return abs_path
     
     return None
 
 
-def load_model():
-    global _model, _model_loaded
-    if _model_loaded:
-        return _model
+def _get_export_dir(model_path: Optional[str]) -> Optional[str]:
+    """Dossier du modèle exporté (services/model_format.py), à côté du pickle par défaut."""
+    candidates = [MODEL_EXPORT_DIR] if MODEL_EXPORT_DIR else []
+    if model_path:
+        candidates.append(os.path.join(os.path.dirname(model_path), "salary_model"))
+    candidates.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "salary_model"))
+    for directory in candidates:
+        if os.path.exists(os.path.join(directory, "manifest.json")):
+            return os.path.abspath(directory)
+    return None
+
+
+def _load_pickle(model_path: str, raw: bytes) -> tuple:
+    logger.debug("model_loading", path=model_path, format="pickle")
+    model_data = pickle.loads(raw)
+    
+    if isinstance(model_data, dict):
+        model = model_data.get('model') or model_data.get('pipeline')
+    else:
+        model = model_data
     
+    if model is None:
+        raise ValueError(f"No model found in {model_path}")
+    
+    # La version identifie le contenu exact du fichier chargé
+    return model, hashlib.sha256(raw).hexdigest()[:12], model_path
+
+
+def _load_from_disk() -> tuple:
     model_path = _get_model_path()
+    export_dir = _get_export_dir(model_path) if MODEL_FORMAT in ("auto", "exported") else None
     
+    if export_dir is not None:
+        from services.model_format import ExportedSalaryModel, read_manifest
+        version = read_manifest(export_dir)["version"]
+        raw = None
+        if MODEL_FORMAT == "auto" and model_path is not None:
+            with open(model_path, 'rb') as f:
+                raw = f.read()
+        # Un export plus ancien que le pickle présent n'est pas utilisé
+        if raw is None or hashlib.sha256(raw).hexdigest()[:12] == version:
+            logger.debug("model_loading", path=export_dir, format="exported")
+            return ExportedSalaryModel(export_dir), version, export_dir
+        logger.warning("exported_model_stale", path=export_dir, version=version,
+                       hint="run scripts/export_model.py; loading the pickle")
+        return _load_pickle(model_path, raw)
+    
+    if MODEL_FORMAT == "exported":
+        raise FileNotFoundError("Exported model not found")
     if model_path is None:
-        print("[ERROR] Model not found")
-        _model_loaded = True
-        return None
+        raise FileNotFoundError("Model not found")
     
-    try:
-        print(f"[DEBUG] Loading model from: {model_path}")
-        with open(model_path, 'rb') as f:
-            model_data = pickle.load(f)
+    with open(model_path, 'rb') as f:
+        raw = f.read()
+    return _load_pickle(model_path, raw)
+
+
+def _set_model(model, version: str, path: str, ready: bool, error: Optional[str] = None):
+    global _model, _model_info, _model_loaded
+    # Simple réaffectation : les prédictions en cours gardent leur référence à l'ancien modèle
+    _model = model
+    _model_info = {
+        "version": version,
+        "path": path,
+        "loaded_at": datetime.now().isoformat(timespec="seconds"),
+        "error": error,
+        "ready": ready,
+    }
+    _model_loaded = True
+    MODEL_INFO.clear()
+    MODEL_INFO.labels(version=version, format=type(model).__name__).set(1)
+
+
+class _PredictionCache:
+    """Cache LRU borné avec expiration (TTL), partagé entre les threads."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if time.monotonic() > expires:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def set(self, key: str, value: dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_cache = _PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    # Le TfidfVectorizer met en minuscules et ignore les espaces multiples
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def _cache_key(
+    version: Optional[str],
+    titre: str,
+    description: str,
+    metier: Optional[str] = None,
+    region: Optional[str] = None,
+    experience: Optional[str] = None,
+    competences: Optional[List[str]] = None
+) -> str:
+    normalized = [
+        version,
+        _normalize_text(titre),
+        _normalize_text(description),
+        # Les colonnes catégorielles sont encodées telles quelles (OneHotEncoder sensible à la casse)
+        (metier or "").strip(),
+        (region or "").strip(),
+        (experience or "").strip(),
+        sorted(_normalize_text(c) for c in competences or []),
+    ]
+    payload = json.dumps(normalized, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def load_model():
+    global _last_load_attempt
+    if _model_loaded:
+        return _model
+    
+    with _model_lock:
+        if _model_loaded:
+            return _model
         
-        if isinstance(model_data, dict):
-            _model = model_data.get('model') or model_data.get('pipeline')
-        else:
-            _model = model_data
+        # Un échec n'est plus définitif : on retente après MODEL_LOAD_RETRY_SECONDS
+        now = time.monotonic()
+        if _last_load_attempt is not None and now - _last_load_attempt < MODEL_LOAD_RETRY_SECONDS:
+            return None
+        _last_load_attempt = now
         
-        print(f"[SUCCESS] Model loaded: {type(_model)}")
-        _model_loaded = True
-        return _model
+        try:
+            model, version, path = _load_from_disk()
+        except Exception as e:
+            ERRORS.labels(stage="load").inc()
+            logger.error("model_load_failed", error=e)
+            _model_info["error"] = str(e)
+            return None
         
+        # Chauffé avant publication : au démarrage comme lors d'une nouvelle
+        # tentative paresseuse après un échec, /ready suit le modèle chargé
+        error = _try_warm_up(model)
+        _set_model(model, version, path, ready=error is None, error=error)
+        logger.info("model_loaded", type=type(model).__name__, version=version, ready=error is None)
+        return _model
+
+
+def _warm_up(model):
+    competences, niveau = analyze_posting(WARMUP_SAMPLE["titre"], WARMUP_SAMPLE["description"])
+    row = _build_features(experience=niveau, competences=competences, **WARMUP_SAMPLE)
+    _model_predict(model, [row])
+
+
+def _try_warm_up(model) -> Optional[str]:
+    """Renvoie le message d'erreur de la chauffe, None si elle a réussi."""
+    try:
+        _warm_up(model)
     except Exception as e:
-        print(f"[ERROR] Failed to load: {e}")
-        _model_loaded = True
-        return None
+        ERRORS.labels(stage="warmup").inc()
+        logger.error("model_warmup_failed", error=e)
+        return str(e)
+    return None
 
 
-def predict_salary(
+def warm_up_model() -> bool:
+    """
+    Charge le modèle et fait passer une prédiction dans tout le pipeline
+    (extraction, DataFrame, preprocessing, XGBoost). Appelé au démarrage.
+    """
+    model = load_model()
+    if model is None:
+        return False
+    if not _model_info["ready"]:
+        # Chauffe du chargement en échec : nouvel essai
+        error = _try_warm_up(model)
+        if error is not None:
+            _model_info["error"] = error
+            return False
+        _model_info["ready"] = True
+    logger.info("model_warmed_up", version=_model_info["version"])
+    return True
+
+
+def reload_model() -> dict:
+    """
+    Recharge le modèle depuis le disque, le chauffe puis le substitue à
+    l'ancien. En cas d'erreur, l'ancien modèle reste en service.
+    """
+    with _reload_lock:
+        model, version, path = _load_from_disk()
+        _warm_up(model)
+        with _model_lock:
+            _set_model(model, version, path, ready=True)
+        _cache.clear()
+    logger.info("model_reloaded", version=version)
+    return get_model_info()
+
+
+def is_model_ready() -> bool:
+    return _model_info["ready"]
+
+
+def get_model_info() -> dict:
+    return dict(_model_info)
+
+
+def _active_model() -> tuple:
+    load_model()
+    # Version lue avant le modèle : pendant un rechargement on peut au pire
+    # associer le nouveau modèle à l'ancienne version, jamais l'inverse.
+    version = _model_info["version"]
+    return _model, version
+
+
+def _build_features(
     titre: str,
     description: str,
     metier: Optional[str] = None,
@@ -69,48 +351,33 @@ def predict_salary(
     experience: Optional[str] = None,
     competences: Optional[List[str]] = None
 ) -> dict:
-    
-    model = load_model()
-    competences_str = ", ".join(competences) if competences else ""
-    
-    if model is not None:
-        try:
-            # ساخت text_features که مدل نیاز داره
-            text_features = f"{titre or ''} {description or ''} {competences_str}"
-            
-            input_data = pd.DataFrame([{
-                "text_features": text_features,
-                "metier": metier or "",
-                "region": region or "",
-                "experience": experience or ""
-            }])
-            
-            print(f"[DEBUG] Input columns: {list(input_data.columns)}")
-            print(f"[DEBUG] Predicting...")
-            
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                prediction = model.predict(input_data)
-            
-            salaire_predit = float(prediction[0])
-            print(f"[SUCCESS] Prediction: {salaire_predit}")
-            
-            return {
-                "salaire_predit": round(salaire_predit, 2),
-                "salaire_min": round(salaire_predit * 0.85, 2),
-                "salaire_max": round(salaire_predit * 1.15, 2),
-                "salaire_mensuel": round(salaire_predit / 12, 2),
-                "marge_erreur": 3900,
-                "model_used": True
-            }
-            
-        except Exception as e:
-            print(f"[ERROR] Prediction failed: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # Fallback
-    print("[DEBUG] Using heuristic fallback")
+    # Ordre stable : les bigrammes du TF-IDF dépendent de l'ordre des compétences
+    competences_str = ", ".join(sorted(competences, key=str.lower)) if competences else ""
+    # ساخت text_features که مدل نیاز داره
+    return {
+        "text_features": f"{titre or ''} {description or ''} {competences_str}",
+        "metier": metier or "",
+        "region": region or "",
+        "experience": experience or ""
+    }
+
+
+def _format_result(salaire: float, model_used: bool) -> dict:
+    return {
+        "salaire_predit": round(salaire, 2),
+        "salaire_min": round(salaire * 0.85, 2),
+        "salaire_max": round(salaire * 1.15, 2),
+        "salaire_mensuel": round(salaire / 12, 2),
+        "marge_erreur": 3900,
+        "model_used": model_used
+    }
+
+
+def _heuristic_salary(
+    region: Optional[str] = None,
+    experience: Optional[str] = None,
+    competences: Optional[List[str]] = None
+) -> float:
     base_salary = 35000
     
     if experience:
@@ -135,36 +402,375 @@ def predict_salary(
             if comp.lower() in high_value:
                 base_salary += 2000
     
-    return {
-        "salaire_predit": round(base_salary, 2),
-        "salaire_min": round(base_salary * 0.85, 2),
-        "salaire_max": round(base_salary * 1.15, 2),
-        "salaire_mensuel": round(base_salary / 12, 2),
-        "marge_erreur": 3900,
-        "model_used": False
-    }
+    return base_salary
 
 
-def extract_competences_from_text(text: str) -> List[str]:
-    KNOWN = [
-        'python', 'java', 'javascript', 'sql', 'react', 'angular', 'vue',
-        'node.js', 'docker', 'kubernetes', 'aws', 'azure', 'gcp',
-        'machine learning', 'deep learning', 'tensorflow', 'pytorch',
-        'git', 'linux', 'agile', 'scrum', 'devops',
-        'mongodb', 'postgresql', 'mysql', 'redis',
-        'typescript', 'c++', 'go', 'rust', 'scala',
-        'fastapi', 'django', 'flask', 'spring', 'php', 'html', 'css'
+class _LeanPipeline:
+    """
+    Chemin d'inférence sans DataFrame pour le Pipeline
+    ColumnTransformer(TfidfVectorizer, OneHotEncoder) + XGBRegressor : le
+    TF-IDF du pipeline est appelé directement sur les textes, le one-hot est
+    construit depuis ses catégories, puis inplace_predict sur le booster avec
+    les mêmes paramètres que XGBRegressor.predict. Lève ValueError pour tout
+    autre pipeline (le chemin DataFrame est alors utilisé).
+    """
+
+    def __init__(self, pipeline):
+        steps = getattr(pipeline, "steps", None)
+        if not steps or len(steps) != 2 or not hasattr(steps[1][1], "get_booster"):
+            raise ValueError("Unsupported pipeline")
+        preprocessor, regressor = steps[0][1], steps[1][1]
+        transformers = {name: (transformer, columns) for name, transformer, columns in preprocessor.transformers_}
+        indices = preprocessor.output_indices_
+        if set(transformers) - {"remainder"} != {"txt", "cat"} or transformers.get("remainder", ("drop",))[0] != "drop" \
+                or not preprocessor.sparse_output_ or indices["txt"].start != 0 or indices["cat"].start != indices["txt"].stop:
+            raise ValueError("Unsupported preprocessor")
+        
+        self.tfidf, self.text_column = transformers["txt"]
+        onehot, self.cat_columns = transformers["cat"]
+        if not isinstance(self.text_column, str) or onehot.drop is not None or onehot.handle_unknown != "ignore" \
+                or getattr(onehot, "_infrequent_enabled", False):
+            raise ValueError("Unsupported encoders")
+        
+        # Colonne (relative au bloc one-hot) de chaque catégorie connue
+        self.categories = []
+        offset = 0
+        for categories in onehot.categories_:
+            self.categories.append({value: offset + i for i, value in enumerate(categories)})
+            offset += len(categories)
+        self.n_cat = offset
+        
+        self.booster = regressor.get_booster()
+        self.missing = regressor.missing
+        self.iteration_range = regressor._get_iteration_range(None)
+    
+    def predict(self, rows: List[dict]):
+        from scipy.sparse import csr_matrix, hstack
+        
+        text = self.tfidf.transform([row[self.text_column] for row in rows])
+        indices, indptr = [], [0]
+        for row in rows:
+            for column, mapping in zip(self.cat_columns, self.categories):
+                index = mapping.get(row[column])
+                if index is not None:
+                    indices.append(index)
+            indptr.append(len(indices))
+        cat = csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(rows), self.n_cat))
+        
+        return self.booster.inplace_predict(
+            hstack([text, cat], format="csr"), iteration_range=self.iteration_range,
+            predict_type="value", missing=self.missing, validate_features=True
+        )
+
+
+# (modèle, prédicteur sans DataFrame ou None), recalculé quand le modèle change
+_lean = (None, None)
+
+
+def _lean_predictor(model):
+    global _lean
+    cached_model, predictor = _lean
+    if cached_model is model:
+        return predictor
+    
+    from services.model_format import ExportedSalaryModel
+    if isinstance(model, ExportedSalaryModel):
+        columns = [model.text_column] + [column for column, _ in model.categories]
+        predictor = lambda rows: model.predict({column: [row[column] for row in rows] for column in columns})
+    else:
+        try:
+            predictor = _LeanPipeline(model).predict
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.debug("lean_inference_unavailable", error=e)
+            predictor = None
+    _lean = (model, predictor)
+    return predictor
+
+
+def _model_predict(model, rows: List[dict]) -> List[float]:
+    predictor = _lean_predictor(model)
+    if predictor is not None:
+        try:
+            return [float(p) for p in predictor(rows)]
+        except Exception as e:
+            ERRORS.labels(stage="lean").inc()
+            logger.error("lean_inference_failed", error=e)
+    
+    input_data = pd.DataFrame(rows)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        prediction = model.predict(input_data)
+    return [float(p) for p in prediction]
+
+
+def _infer(model, version: str, rows: List[dict]) -> List[float]:
+    # Pool de processus si INFERENCE_BACKEND=process ; saturé ou indisponible : ici même
+    INFERENCE_ROWS.observe(len(rows))
+    pool = get_inference_pool()
+    if pool is not None:
+        started = time.perf_counter()
+        predictions = pool.predict(version, rows)
+        if predictions is not None:
+            elapsed = time.perf_counter() - started
+            INFERENCE_SECONDS.labels(backend="process").observe(elapsed)
+            record_timing("model", elapsed)
+            return predictions
+    started = time.perf_counter()
+    predictions = _model_predict(model, rows)
+    elapsed = time.perf_counter() - started
+    INFERENCE_SECONDS.labels(backend="local").observe(elapsed)
+    record_timing("model", elapsed)
+    return predictions
+
+
+def predict_salary(
+    titre: str,
+    description: str,
+    metier: Optional[str] = None,
+    region: Optional[str] = None,
+    experience: Optional[str] = None,
+    competences: Optional[List[str]] = None
+) -> dict:
+    
+    model, version = _active_model()
+    
+    if model is not None:
+        key = _cache_key(version, titre, description, metier, region, experience, competences)
+        cached = _cache.get(key)
+        if cached is not None:
+            PREDICTIONS.labels(source="cache").inc()
+            return cached
+        
+        try:
+            row = _build_features(titre, description, metier, region, experience, competences)
+            salaire_predit = _infer(model, version, [row])[0]
+            logger.debug("prediction", salaire=salaire_predit, version=version)
+            
+            result = _format_result(salaire_predit, True)
+            _cache.set(key, result)
+            PREDICTIONS.labels(source="model").inc()
+            return result
+            
+        except Exception as e:
+            ERRORS.labels(stage="single").inc()
+            logger.exception("prediction_failed", error=e)
+    
+    # Fallback
+    reason = "no_model" if model is None else "error"
+    FALLBACKS.labels(reason=reason).inc()
+    PREDICTIONS.labels(source="fallback").inc()
+    logger.debug("heuristic_fallback", reason=reason)
+    return _format_result(_heuristic_salary(region, experience, competences), False)
+
+
+def predict_salaries(items: List[dict], use_cache: bool = True) -> List[dict]:
+    """
+    Prédit les salaires de plusieurs offres avec un seul appel model.predict.
+    Chaque item accepte les mêmes clés que predict_salary ; les résultats
+    sont renvoyés dans l'ordre des items. use_cache=False (traitements de
+    masse) ne lit ni ne remplit le cache des prédictions.
+    """
+    if not items:
+        return []
+    
+    model, version = _active_model()
+    
+    if model is not None:
+        keys = [_cache_key(version, **item) for item in items] if use_cache else [None] * len(items)
+        results = [_cache.get(key) for key in keys] if use_cache else [None] * len(items)
+        missing = [i for i, result in enumerate(results) if result is None]
+        PREDICTIONS.labels(source="cache").inc(len(items) - len(missing))
+        if not missing:
+            return results
+        
+        rows = [_build_features(**items[i]) for i in missing]
+        try:
+            predictions = _infer(model, version, rows)
+        except Exception as e:
+            # Une ligne invalide ne doit pas faire échouer tout le lot
+            ERRORS.labels(stage="batch").inc()
+            logger.error("batch_prediction_failed", rows=len(rows), error=e)
+            for i in missing:
+                results[i] = predict_salary(**items[i])
+            return results
+        
+        PREDICTIONS.labels(source="model").inc(len(missing))
+        logger.debug("batch_prediction", rows=len(rows), version=version)
+        for i, prediction in zip(missing, predictions):
+            results[i] = _format_result(prediction, True)
+            if use_cache:
+                _cache.set(keys[i], results[i])
+        return results
+    
+    FALLBACKS.labels(reason="no_model").inc(len(items))
+    PREDICTIONS.labels(source="fallback").inc(len(items))
+    logger.debug("heuristic_fallback", reason="no_model", rows=len(items))
+    return [
+        _format_result(
+            _heuristic_salary(item.get("region"), item.get("experience"), item.get("competences")),
+            False
+        )
+        for item in items
     ]
-    text_lower = text.lower()
-    return [c for c in KNOWN if c in text_lower]
+
+
+KNOWN_COMPETENCES = [
+    'python', 'java', 'javascript', 'sql', 'react', 'angular', 'vue',
+    'node.js', 'docker', 'kubernetes', 'aws', 'azure', 'gcp',
+    'machine learning', 'deep learning', 'tensorflow', 'pytorch',
+    'git', 'linux', 'agile', 'scrum', 'devops',
+    'mongodb', 'postgresql', 'mysql', 'redis',
+    'typescript', 'c++', 'go', 'rust', 'scala',
+    'fastapi', 'django', 'flask', 'spring', 'php', 'html', 'css'
+]
+
+# Par ordre de priorité : le premier niveau trouvé l'emporte
+EXPERIENCE_TERMS = [
+    ("Senior (5+ ans)", ['senior', '5 ans', '10 ans', 'expert', 'lead']),
+    ("Junior (0-2 ans)", ['junior', 'débutant', '0-2 ans']),
+    ("Intermédiaire (2-5 ans)", ['intermédiaire', '2-5 ans', '3 ans']),
+]
+
+
+# Au-delà, une regex unique (trie) est plus rapide qu'un str.find par terme
+MATCHER_SCAN_MAX_TERMS = 80
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _contains_word(text: str, term: str) -> bool:
+    # str.find (C) puis contrôle des bornes : "go" ne correspond pas à "google"
+    size = len(text)
+    start = text.find(term)
+    while start != -1:
+        end = start + len(term)
+        if (start == 0 or not _is_word_char(text[start - 1])) and (end == size or not _is_word_char(text[end])):
+            return True
+        start = text.find(term, start + 1)
+    return False
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    # Préfixes communs factorisés : le moteur regex teste un seul caractère par branche
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class _TextMatcher:
+    """
+    Table de termes (compétences + niveaux d'expérience) construite une fois.
+    Les termes sont délimités par des caractères non alphanumériques : "go"
+    ne correspond plus à "google", ni "java" à "javascript". Petit vocabulaire :
+    un str.find par terme ; vocabulaire étendu (table Competence) : une regex
+    compilée en trie, parcourue une seule fois.
+    """
+
+    def __init__(self, competences: List[str]):
+        self.competences = list(dict.fromkeys(c.strip().lower() for c in competences if c and c.strip()))
+        self._rank = {c: i for i, c in enumerate(self.competences)}
+        # Un mot peut être à la fois compétence et niveau ("lead", "expert")
+        self._levels = {}
+        for level, words in EXPERIENCE_TERMS:
+            for word in words:
+                self._levels.setdefault(word, level)
+        self._level_rank = {level: rank for rank, (level, _) in enumerate(EXPERIENCE_TERMS)}
+        self._pattern = None
+        terms = list(dict.fromkeys(self.competences + list(self._levels)))
+        if len(terms) > MATCHER_SCAN_MAX_TERMS:
+            # Lookahead : une correspondance (la plus longue) à chaque début de mot,
+            # y compris à l'intérieur d'un autre terme ("learning" dans "machine learning")
+            self._pattern = re.compile(rf"(?<!\w)(?=({_trie_pattern(terms)})(?!\w))")
+            # Termes plus courts commençant au même endroit ("machine" / "machine learning")
+            known = set(terms)
+            self._prefixes = {t: [t[:k] for k in range(1, len(t)) if t[:k] in known] for t in terms}
+
+    def _regex_terms(self, text: str) -> set:
+        found = set()
+        size = len(text)
+        for match in self._pattern.finditer(text):
+            term = match.group(1)
+            found.add(term)
+            start = match.start()
+            for prefix in self._prefixes[term]:
+                end = start + len(prefix)
+                if end == size or not _is_word_char(text[end]):
+                    found.add(prefix)
+        return found
+
+    def scan(self, text: str, with_competences: bool = True, with_level: bool = True) -> tuple:
+        text_lower = (text or "").lower()
+        if self._pattern is not None:
+            found = self._regex_terms(text_lower)
+            competences = {t for t in found if t in self._rank} if with_competences else set()
+            level = self._best_level(self._levels[t] for t in found if t in self._levels) if with_level else None
+            return competences, level
+        
+        competences = set()
+        if with_competences:
+            competences = {c for c in self.competences if _contains_word(text_lower, c)}
+        level = None
+        if with_level:
+            # Termes par ordre de priorité : on s'arrête au premier trouvé
+            level = next((lvl for word, lvl in self._levels.items() if _contains_word(text_lower, word)), None)
+        return competences, level
+
+    def _best_level(self, levels) -> Optional[str]:
+        return min(levels, key=self._level_rank.__getitem__, default=None)
+
+    def sorted_competences(self, found: set) -> List[str]:
+        return sorted(found, key=self._rank.__getitem__)
+
+
+_matcher = _TextMatcher(KNOWN_COMPETENCES)
+
+
+def refresh_skill_matcher() -> int:
+    """
+    Reconstruit le matcher avec les compétences de la table Competence en
+    plus de la liste connue. Renvoie le nombre de compétences reconnues.
+    """
+    global _matcher
+    from services.search_service import get_all_competences
+    libelles = [row["libelle"] for row in get_all_competences() if row.get("libelle")]
+    _matcher = _TextMatcher(KNOWN_COMPETENCES + libelles)
+    return len(_matcher.competences)
+
+
+def analyze_posting(titre: str, description: str) -> tuple:
+    """
+    Extrait en un seul passage les compétences (titre + description) et le
+    niveau d'expérience (description seule).
+    """
+    started = time.perf_counter()
+    matcher = _matcher
+    competences, level = matcher.scan(description)
+    competences |= matcher.scan(titre, with_level=False)[0]
+    result = matcher.sorted_competences(competences), level
+    elapsed = time.perf_counter() - started
+    FEATURE_EXTRACTION_SECONDS.observe(elapsed)
+    record_timing("extract", elapsed)
+    return result
+
+
+def extract_competences_from_text(text: str) -> List[str]:
+    matcher = _matcher
+    return matcher.sorted_competences(matcher.scan(text, with_level=False)[0])
 
 
 def get_experience_level(text: str) -> Optional[str]:
-    text_lower = text.lower()
-    if any(t in text_lower for t in ['senior', '5 ans', '10 ans', 'expert', 'lead']):
-        return "Senior (5+ ans)"
-    elif any(t in text_lower for t in ['junior', 'débutant', '0-2 ans']):
-        return "Junior (0-2 ans)"
-    elif any(t in text_lower for t in ['intermédiaire', '2-5 ans', '3 ans']):
-        return "Intermédiaire (2-5 ans)"
-    return None
\ No newline at end of file
+    return _matcher.scan(text, with_competences=False)[1]
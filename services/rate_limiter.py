@@ -0,0 +1,257 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, Request
+import hashlib
+import math
+import os
+import threading
+import time
+from database import Database
+from services.auth_service import get_current_user
+from services.log import get_logger
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" : compteurs propres à chaque worker ; "mysql" : partagés entre workers et serveurs
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MEMORY_MAX_KEYS = int(os.getenv("RATE_LIMIT_MEMORY_MAX_KEYS", "100000"))
+# Nombre de proxys de confiance devant l'application. 0 (défaut) : adresse de la
+# connexion, X-Forwarded-For ignoré (falsifiable sans proxy). n : l'IP cliente est
+# la n-ième en partant de la fin de X-Forwarded-For. Derrière le proxy de Render ou
+# Railway, mettre 1 : sinon tous les clients partagent les seaux de l'IP du proxy
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+RATE_LIMIT_SWEEP_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_SECONDS", "3600"))
+
+# Règle -> "N/S" : seau de N jetons, rechargé de N jetons toutes les S secondes.
+# Surchargeable par RATE_LIMIT_<RÈGLE>, ex. RATE_LIMIT_LOGIN=20/60
+RATE_LIMIT_DEFAULTS = {
+    "login": "10/60",        # par IP
+    "otp": "5/300",          # par IP : envoi de codes (SMTP)
+    "otp_email": "3/900",    # par adresse destinataire
+    "predict": "60/60",      # par utilisateur
+}
+# Requêtes simultanées par classe de routes dans un worker ; 0 : pas de limite.
+# "auth" couvre les routes qui hachent un mot de passe ou envoient un code.
+# Surchargeable par CONCURRENCY_LIMIT_<CLASSE>
+CONCURRENCY_DEFAULTS = {
+    "auth": "16",
+    "predict": "32",
+}
+
+logger = get_logger("rate_limit")
+
+
+def _parse_rule(value: str) -> tuple:
+    tokens, seconds = value.split("/")
+    capacity = float(tokens)
+    return capacity, capacity / float(seconds)
+
+
+RATE_LIMIT_RULES = {
+    name: _parse_rule(os.getenv(f"RATE_LIMIT_{name.upper()}", default))
+    for name, default in RATE_LIMIT_DEFAULTS.items()
+}
+CONCURRENCY_LIMITS = {
+    name: int(os.getenv(f"CONCURRENCY_LIMIT_{name.upper()}", default))
+    for name, default in CONCURRENCY_DEFAULTS.items()
+}
+
+
+class RateLimitBackend(ABC):
+    """Seaux à jetons indexés par clé ; take() renvoie (autorisé, secondes avant le prochain jeton)."""
+
+    @abstractmethod
+    def take(self, key: str, capacity: float, refill_per_second: float) -> tuple:
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # Au-delà de max_keys, les clés les moins récentes sont oubliées (seau plein)
+                while len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [capacity, now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / refill_per_second
+
+
+class MySQLRateLimitBackend(RateLimitBackend):
+    """Table RateLimitBucket (migrations/006_rate_limit_buckets.sql), horloge de la base."""
+
+    # Affectations évaluées de gauche à droite : `allowed` voit l'ancien solde,
+    # `tokens` le nouveau `allowed`
+    TAKE_QUERY = """
+        INSERT INTO RateLimitBucket (bucket_key, tokens, updated_at, allowed)
+        VALUES (%s, %s - 1, UNIX_TIMESTAMP(NOW(6)), 1)
+        ON DUPLICATE KEY UPDATE
+            allowed = LEAST(%s, tokens + (UNIX_TIMESTAMP(NOW(6)) - updated_at) * %s) >= 1,
+            tokens = LEAST(%s, tokens + (UNIX_TIMESTAMP(NOW(6)) - updated_at) * %s) - allowed,
+            updated_at = UNIX_TIMESTAMP(NOW(6))
+    """
+
+    def __init__(self):
+        self._last_sweep = time.monotonic()
+
+    def take(self, key, capacity, refill_per_second):
+        # Même transaction : la ligne reste verrouillée jusqu'à la lecture du résultat
+        row = Database.execute_fetch_one(
+            self.TAKE_QUERY, (key, capacity, capacity, refill_per_second, capacity, refill_per_second),
+            "SELECT tokens, allowed FROM RateLimitBucket WHERE bucket_key = %s", (key,)
+        )
+        self._maybe_sweep()
+        if row["allowed"]:
+            return True, 0.0
+        return False, (1 - row["tokens"]) / refill_per_second
+
+    def _maybe_sweep(self):
+        # Un seau inactif depuis un jour est plein : la ligne est inutile
+        now = time.monotonic()
+        if now - self._last_sweep < RATE_LIMIT_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        Database.execute("DELETE FROM RateLimitBucket WHERE updated_at < UNIX_TIMESTAMP() - 86400")
+
+
+def create_rate_limit_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if kind == "mysql":
+        return MySQLRateLimitBackend()
+    if kind == "memory":
+        return InMemoryRateLimitBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {kind}")
+
+
+class RateLimiter:
+    """
+    Limite de débit par règle et identité (IP, utilisateur, email). Si le
+    backend partagé est indisponible, la requête passe : la limitation ne doit
+    pas rendre la connexion impossible.
+    """
+
+    def __init__(self, backend: RateLimitBackend, rules: dict = RATE_LIMIT_RULES):
+        self.backend = backend
+        self.rules = rules
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "limited": 0, "backend_errors": 0}
+        self.limited_by_rule = {name: 0 for name in rules}
+
+    def check(self, rule: str, identity):
+        """Lève 429 (avec Retry-After) quand le seau de (rule, identity) est vide."""
+        if not RATE_LIMIT_ENABLED or identity is None:
+            return
+        capacity, refill = self.rules[rule]
+        # Les emails et IP ne sont pas stockés en clair
+        key = f"{rule}:{hashlib.sha256(str(identity).lower().encode()).hexdigest()[:32]}"
+        try:
+            allowed, retry_after = self.backend.take(key, capacity, refill)
+        except Exception as e:
+            with self._lock:
+                self.stats["backend_errors"] += 1
+            logger.error("rate_limit_backend_failed", rule=rule, error=e)
+            return
+        with self._lock:
+            if allowed:
+                self.stats["allowed"] += 1
+            else:
+                self.stats["limited"] += 1
+                self.limited_by_rule[rule] += 1
+        if not allowed:
+            raise HTTPException(status_code=429, detail="Too many requests",
+                                headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["limited_by_rule"] = dict(self.limited_by_rule)
+        stats["backend"] = type(self.backend).__name__
+        stats["enabled"] = RATE_LIMIT_ENABLED
+        return stats
+
+
+class ConcurrencyLimiter:
+    """
+    Requêtes en cours par classe de routes dans le worker. Au-delà de la
+    limite, 503 immédiat plutôt qu'une file sans fin dans le threadpool.
+    """
+
+    def __init__(self, limits: dict = CONCURRENCY_LIMITS):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._active = {name: 0 for name in limits}
+        self.rejected = {name: 0 for name in limits}
+
+    def try_acquire(self, route_class: str) -> bool:
+        limit = self.limits[route_class]
+        with self._lock:
+            if limit and self._active[route_class] >= limit:
+                self.rejected[route_class] += 1
+                return False
+            self._active[route_class] += 1
+            return True
+
+    def release(self, route_class: str):
+        with self._lock:
+            self._active[route_class] -= 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {"active": self._active[name], "limit": limit, "rejected": self.rejected[name]}
+                for name, limit in self.limits.items()
+            }
+
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
+concurrency_limiter = ConcurrencyLimiter()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_PROXY_HOPS > 0:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        # Les entrées de gauche viennent du client (falsifiables) : on prend celle ajoutée par notre proxy
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            return forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return request.client.host if request.client else None
+
+
+def limit_by_ip(rule: str):
+    """Dépendance FastAPI : seau `rule` par adresse IP du client."""
+    def dependency(request: Request):
+        rate_limiter.check(rule, client_ip(request))
+    return dependency
+
+
+def limit_by_user(rule: str):
+    """Dépendance FastAPI : seau `rule` par utilisateur authentifié."""
+    def dependency(current_user: dict = Depends(get_current_user)):
+        rate_limiter.check(rule, current_user["idUtilisateur"])
+    return dependency
+
+
+def limit_concurrency(route_class: str):
+    """Dépendance FastAPI : place réservée dans `route_class` pendant toute la requête."""
+    async def dependency():
+        if not concurrency_limiter.try_acquire(route_class):
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+        try:
+            yield
+        finally:
+            concurrency_limiter.release(route_class)
+    return dependency
+
+
+def get_limits_stats() -> dict:
+    return {"rate": rate_limiter.get_stats(), "concurrency": concurrency_limiter.get_stats()}
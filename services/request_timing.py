@@ -0,0 +1,87 @@
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+import os
+import threading
+
+# En-tête Server-Timing sur les réponses (durées internes visibles du client)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+# Durées conservées par route pour les percentiles de /stats/routes
+ROUTE_LATENCY_WINDOW = int(os.getenv("ROUTE_LATENCY_WINDOW", "1024"))
+
+# Durées de la requête en cours : {nom: [secondes, nombre]}. Le dictionnaire
+# est partagé avec les threads de run_in_threadpool (contexte copié).
+_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> Dict[str, list]:
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def record_timing(name: str, seconds: float):
+    """Ajoute une durée à la requête en cours ; sans requête (tâches de fond), ne fait rien."""
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(name)
+    if entry is None:
+        timings[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def server_timing_header(timings: Dict[str, list], total: float) -> str:
+    parts = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"' for name, (seconds, count) in list(timings.items())]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class RouteLatency:
+    """Fenêtre glissante des durées par route (méthode + gabarit) et compteurs d'erreurs."""
+
+    def __init__(self, window: int = ROUTE_LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations: Dict[str, deque] = {}
+        self._counts: Dict[str, list] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float):
+        key = f"{method} {route}"
+        with self._lock:
+            durations = self._durations.get(key)
+            if durations is None:
+                durations = self._durations[key] = deque(maxlen=self.window)
+                self._counts[key] = [0, 0]
+            durations.append(seconds)
+            self._counts[key][0] += 1
+            if status >= 500:
+                self._counts[key][1] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            snapshot = {key: (sorted(durations), self._counts[key]) for key, durations in self._durations.items()}
+        stats = {}
+        for key, (durations, (requests, errors)) in sorted(snapshot.items()):
+            stats[key] = {
+                "requests": requests,
+                "errors_5xx": errors,
+                "window": len(durations),
+                "p50_ms": round(_percentile(durations, 50) * 1000, 2),
+                "p90_ms": round(_percentile(durations, 90) * 1000, 2),
+                "p99_ms": round(_percentile(durations, 99) * 1000, 2),
+                "max_ms": round(durations[-1] * 1000, 2),
+            }
+        return stats
+
+
+route_latency = RouteLatency()
@@ -1,21 +1,215 @@
 from typing import List, Optional
-from database import Database
+from decimal import Decimal
+from datetime import datetime
+from fastapi import HTTPException
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from database import Database, AsyncDatabase
+from services.log import get_logger
+
+# Recherche par mot-clé via l'index FULLTEXT (migrations/001_offre_search_indexes.sql) :
+# "auto" si l'index existe (LIKE sinon), "1" toujours, "0" jamais
+SEARCH_FULLTEXT = os.getenv("SEARCH_FULLTEXT", "auto")
+FULLTEXT_INDEX = "ft_offre_titre_description"
+# innodb_ft_min_token_size : les mots plus courts ne sont pas indexés
+FULLTEXT_MIN_TOKEN = int(os.getenv("FULLTEXT_MIN_TOKEN", "3"))
+# Durée de vie des COUNT(*) mis en cache par combinaison de filtres
+SEARCH_COUNT_TTL = float(os.getenv("SEARCH_COUNT_TTL", "60"))
+
+# Données de référence (métiers, régions...) : modifiées quelques fois par an
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+
+_count_cache = {}
+_count_lock = threading.Lock()
+# Présence de l'index FULLTEXT (mode auto), lue à la première recherche par mot-clé
+_fulltext_index = None
+
+logger = get_logger("search")
+
+OFFRE_JOINS = {
+    "m": "LEFT JOIN Metiers m ON o.idMetier = m.idMetier",
+    "e": "LEFT JOIN Experience e ON o.idExperience = e.idExperience",
+    "d": "LEFT JOIN Departement d ON o.idDepartement = d.idDepartement",
+    "r": "LEFT JOIN Region r ON d.idRegion = r.idRegion",
+    "s": "LEFT JOIN Salaire s ON o.idsalaire = s.idsalaire",
+}
+
+
+REFERENCE_QUERIES = {
+    "metiers": "SELECT idMetier, libelle FROM Metiers ORDER BY libelle",
+    "regions": "SELECT idRegion, region FROM Region ORDER BY region",
+    "experiences": "SELECT idExperience, libelle FROM Experience ORDER BY idExperience",
+    "competences": "SELECT idCompetence, libelle FROM Competence ORDER BY libelle",
+}
+
+
+class _ReferenceCache:
+    """
+    Tables de référence gardées en mémoire avec un ETag fort calculé sur le
+    contenu. Rechargées après REFERENCE_CACHE_TTL ou sur demande (refresh).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> tuple:
+        data = Database.fetch_all(REFERENCE_QUERIES[name])
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+        entry = (time.monotonic() + self.ttl, data, f'"{digest[:32]}"')
+        self._entries[name] = entry
+        return entry
+
+    def get(self, name: str) -> tuple:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] < time.monotonic():
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is None or entry[0] < time.monotonic():
+                    entry = self._load(name)
+        return entry[1], entry[2]
+
+    def refresh(self) -> dict:
+        with self._lock:
+            return {name: len(self._load(name)[1]) for name in REFERENCE_QUERIES}
+
+
+_reference = _ReferenceCache(REFERENCE_CACHE_TTL)
+
+
+def get_reference(name: str) -> tuple:
+    """Renvoie (lignes, etag) pour une table de référence."""
+    return _reference.get(name)
+
+
+def refresh_reference_data() -> dict:
+    """Recharge toutes les tables de référence ; renvoie le nombre de lignes par table."""
+    global _fulltext_index
+    # Une migration appliquée depuis le démarrage est prise en compte
+    _fulltext_index = None
+    return _reference.refresh()
 
 
 def get_all_metiers() -> List[dict]:
-    return Database.fetch_all("SELECT idMetier, libelle FROM Metiers ORDER BY libelle")
+    return get_reference("metiers")[0]
 
 
 def get_all_regions() -> List[dict]:
-    return Database.fetch_all("SELECT idRegion, region FROM Region ORDER BY region")
+    return get_reference("regions")[0]
 
 
 def get_all_experiences() -> List[dict]:
-    return Database.fetch_all("SELECT idExperience, libelle FROM Experience ORDER BY idExperience")
+    return get_reference("experiences")[0]
 
 
 def get_all_competences() -> List[dict]:
-    return Database.fetch_all("SELECT idCompetence, libelle FROM Competence ORDER BY libelle")
+    return get_reference("competences")[0]
+
+
+def _fulltext_enabled() -> bool:
+    global _fulltext_index
+    if SEARCH_FULLTEXT != "auto":
+        return SEARCH_FULLTEXT == "1"
+    if _fulltext_index is None:
+        row = Database.fetch_one(
+            """SELECT COUNT(*) as total FROM information_schema.STATISTICS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Offre' AND INDEX_NAME = %s""",
+            (FULLTEXT_INDEX,)
+        )
+        _fulltext_index = bool(row and row["total"])
+        if not _fulltext_index:
+            logger.warning("fulltext_index_missing", index=FULLTEXT_INDEX, fallback="LIKE")
+    return _fulltext_index
+
+
+def _fulltext_query(keyword: str) -> Optional[str]:
+    """
+    Convertit le mot-clé en requête MATCH ... AGAINST en mode booléen : chaque
+    mot est obligatoire et recherché en préfixe. Renvoie None si aucun mot
+    n'est indexable (trop court), auquel cas on retombe sur LIKE.
+    """
+    words = [w for w in re.findall(r"\w+", keyword) if len(w) >= FULLTEXT_MIN_TOKEN]
+    if not words:
+        return None
+    return " ".join(f"+{w}*" for w in words)
+
+
+def _encode_cursor(values: list) -> str:
+    # Les DECIMAL sont transmis en texte pour garder une comparaison exacte
+    payload = [
+        {"d": str(v)} if isinstance(v, Decimal) else {"t": v.isoformat()} if isinstance(v, datetime) else v
+        for v in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError
+        return [
+            (Decimal(v["d"]) if "d" in v else datetime.fromisoformat(v["t"])) if isinstance(v, dict) else v
+            for v in payload
+        ]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _keyset_condition(keys: list) -> tuple:
+    """
+    Condition « après le curseur » pour un tri DESC lexicographique sur
+    keys = [(expression, paramètres de l'expression, valeur, nullable), ...].
+    Les NULL (MySQL) sont en fin de tri décroissant.
+    """
+    (expr, expr_params, value, nullable), rest = keys[0], keys[1:]
+    
+    if value is None:
+        if not rest:
+            return "FALSE", []
+        rest_sql, rest_params = _keyset_condition(rest)
+        return f"({expr} IS NULL AND {rest_sql})", expr_params + rest_params
+    
+    if nullable:
+        below, below_params = f"{expr} < %s OR {expr} IS NULL", expr_params + [value] + expr_params
+    else:
+        below, below_params = f"{expr} < %s", expr_params + [value]
+    if not rest:
+        return f"({below})", below_params
+    
+    rest_sql, rest_params = _keyset_condition(rest)
+    return f"({below} OR ({expr} = %s AND {rest_sql}))", below_params + expr_params + [value] + rest_params
+
+
+def _count_offres(joins: str, where_clause: str, params: list) -> int:
+    key = (joins, where_clause, tuple(params))
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    
+    count_result = Database.fetch_one(
+        f"""SELECT COUNT(*) as total
+            FROM Offre o
+            {joins}
+            WHERE {where_clause}""",
+        tuple(params) if params else None
+    )
+    total = count_result["total"] if count_result else 0
+    
+    with _count_lock:
+        if len(_count_cache) > 1000:
+            _count_cache.clear()
+        _count_cache[key] = (now + SEARCH_COUNT_TTL, total)
+    return total
 
 
 def search_offres(
@@ -26,89 +220,133 @@ def search_offres(
     salaire_max: Optional[float] = None,
     keyword: Optional[str] = None,
     page: int = 1,
-    limit: int = 20
+    limit: int = 20,
+    metier_id: Optional[int] = None,
+    region_id: Optional[int] = None,
+    experience_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True
 ) -> dict:
     conditions = []
     params = []
+    # Alias nécessaires au COUNT : les LEFT JOIN sur clé primaire non filtrés
+    # ne changent pas le nombre de lignes et sont omis
+    count_aliases = set()
+    
+    # Filtres par identifiant : égalité sur les clés étrangères indexées
+    if metier_id is not None:
+        conditions.append("o.idMetier = %s")
+        params.append(metier_id)
+    
+    if region_id is not None:
+        conditions.append("d.idRegion = %s")
+        params.append(region_id)
+        count_aliases.add("d")
+    
+    if experience_id is not None:
+        conditions.append("o.idExperience = %s")
+        params.append(experience_id)
     
     if metier:
         conditions.append("m.libelle LIKE %s")
         params.append(f"%{metier}%")
+        count_aliases.add("m")
     
     if region:
         conditions.append("r.region LIKE %s")
         params.append(f"%{region}%")
+        count_aliases.update(("d", "r"))
     
     if experience:
         conditions.append("e.libelle LIKE %s")
         params.append(f"%{experience}%")
+        count_aliases.add("e")
     
     if salaire_min is not None:
-        conditions.append("s.salaire_avg >= %s")
+        conditions.append("o.salaire_avg >= %s")
         params.append(salaire_min)
     
     if salaire_max is not None:
-        conditions.append("s.salaire_avg <= %s")
+        conditions.append("o.salaire_avg <= %s")
         params.append(salaire_max)
     
-    if keyword:
+    fulltext = _fulltext_query(keyword) if keyword and _fulltext_enabled() else None
+    if fulltext:
+        conditions.append("MATCH(o.titre, o.description) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(fulltext)
+    elif keyword:
         conditions.append("(o.titre LIKE %s OR o.description LIKE %s)")
         params.append(f"%{keyword}%")
         params.append(f"%{keyword}%")
     
     where_clause = " AND ".join(conditions) if conditions else "1=1"
     
-    count_result = Database.fetch_one(
-        f"""SELECT COUNT(*) as total
-            FROM Offre o
-            LEFT JOIN Metiers m ON o.idMetier = m.idMetier
-            LEFT JOIN Experience e ON o.idExperience = e.idExperience
-            LEFT JOIN Departement d ON o.idDepartement = d.idDepartement
-            LEFT JOIN Region r ON d.idRegion = r.idRegion
-            LEFT JOIN Salaire s ON o.idsalaire = s.idsalaire
-            WHERE {where_clause}""",
-        tuple(params) if params else None
-    )
-    total = count_result["total"] if count_result else 0
+    total = None
+    if include_total:
+        count_joins = "\n".join(sql for alias, sql in OFFRE_JOINS.items() if alias in count_aliases)
+        total = _count_offres(count_joins, where_clause, params)
     
-    offset = (page - 1) * limit
-    params.extend([limit, offset])
+    # Avec un mot-clé, tri par pertinence puis par salaire ; idOffre départage
+    relevance = ""
+    select_params = []
+    sort_keys = [("o.salaire_avg", [], "salaire_avg", True), ("o.idOffre", [], "idOffre", False)]
+    if fulltext:
+        relevance = "MATCH(o.titre, o.description) AGAINST (%s IN BOOLEAN MODE) as pertinence,"
+        select_params.append(fulltext)
+        sort_keys.insert(0, ("MATCH(o.titre, o.description) AGAINST (%s IN BOOLEAN MODE)", [fulltext], "pertinence", False))
+    order_by = ", ".join(f"{column if expr_params else expr} DESC" for expr, expr_params, column, _ in sort_keys)
+    
+    # Pagination par curseur (seek) : sans mot-clé, lecture de idx_offre_salaire_avg
+    # (migrations/008) dans l'ordre, sans tri ni OFFSET
+    page_clause = "LIMIT %s OFFSET %s"
+    page_params = [limit + 1, (page - 1) * limit]
+    seek_clause = ""
+    seek_params = []
+    if cursor:
+        values = _decode_cursor(cursor, len(sort_keys))
+        keys = [(expr, expr_params, value, nullable) for (expr, expr_params, _, nullable), value in zip(sort_keys, values)]
+        seek_clause, seek_params = _keyset_condition(keys)
+        seek_clause = f"AND {seek_clause}"
+        page_clause = "LIMIT %s"
+        page_params = [limit + 1]
     
     offres = Database.fetch_all(
-        f"""SELECT 
+        f"""SELECT {relevance}
             o.idOffre,
             o.titre,
             o.description,
             s.salaire_min,
             s.salaire_max,
-            s.salaire_avg,
+            o.salaire_avg,
             m.libelle as metier,
             e.libelle as experience,
             d.departement,
             r.region
         FROM Offre o
-        LEFT JOIN Metiers m ON o.idMetier = m.idMetier
-        LEFT JOIN Experience e ON o.idExperience = e.idExperience
-        LEFT JOIN Departement d ON o.idDepartement = d.idDepartement
-        LEFT JOIN Region r ON d.idRegion = r.idRegion
-        LEFT JOIN Salaire s ON o.idsalaire = s.idsalaire
-        WHERE {where_clause}
-        ORDER BY s.salaire_avg DESC
-        LIMIT %s OFFSET %s""",
-        tuple(params)
+        {chr(10).join(OFFRE_JOINS.values())}
+        WHERE {where_clause} {seek_clause}
+        ORDER BY {order_by}
+        {page_clause}""",
+        tuple(select_params + params + seek_params + page_params)
     )
     
+    # Une ligne de plus que demandé indique qu'une page suivante existe
+    next_cursor = None
+    if len(offres) > limit:
+        offres = offres[:limit]
+        last = offres[-1]
+        next_cursor = _encode_cursor([last[column] for _, _, column, _ in sort_keys])
+    
     return {
         "total": total,
-        "page": page,
+        "page": None if cursor else page,
         "limit": limit,
+        "next_cursor": next_cursor,
         "offres": offres
     }
 
 
-def get_offre_by_id(offre_id: int) -> Optional[dict]:
-    return Database.fetch_one(
-        """SELECT 
+OFFRE_DETAIL_QUERY = """SELECT 
             o.idOffre, o.titre, o.description,
             s.salaire_min, s.salaire_max, s.salaire_avg,
             m.libelle as metier, e.libelle as experience,
@@ -119,6 +357,12 @@ def get_offre_by_id(offre_id: int) -> Optional[dict]:
         LEFT JOIN Departement d ON o.idDepartement = d.idDepartement
         LEFT JOIN Region r ON d.idRegion = r.idRegion
         LEFT JOIN Salaire s ON o.idsalaire = s.idsalaire
-        WHERE o.idOffre = %s""",
-        (offre_id,)
-    )
+        WHERE o.idOffre = %s"""
+
+
+def get_offre_by_id(offre_id: int) -> Optional[dict]:
+    return Database.fetch_one(OFFRE_DETAIL_QUERY, (offre_id,))
+
+
+async def get_offre_by_id_async(offre_id: int) -> Optional[dict]:
+    return await AsyncDatabase.fetch_one(OFFRE_DETAIL_QUERY, (offre_id,))
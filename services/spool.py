@@ -0,0 +1,99 @@
+import glob
+import json
+import os
+from services.log import get_logger
+
+logger = get_logger("spool")
+
+# Fichiers de secours JSONL par processus : chaque worker uvicorn écrit et
+# réécrit uniquement le sien. Les fichiers laissés par un worker arrêté (et
+# l'ancien fichier commun) sont repris par un worker vivant.
+
+
+def process_spool_path(path: str) -> str:
+    """history_spool.jsonl -> history_spool.<pid>.jsonl"""
+    root, ext = os.path.splitext(os.path.abspath(path))
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _orphans(path: str, own_path: str) -> list:
+    root, ext = os.path.splitext(os.path.abspath(path))
+    orphans = [os.path.abspath(path)] if os.path.exists(path) else []
+    for candidate in glob.glob(f"{glob.escape(root)}.*{ext}"):
+        pid = candidate[len(root) + 1:-len(ext)]
+        if candidate != own_path and pid.isdigit() and not _pid_alive(int(pid)):
+            orphans.append(candidate)
+    # Reprise interrompue (arrêt entre le renommage et la copie)
+    for candidate in glob.glob(f"{glob.escape(root)}*{ext}.claimed-*"):
+        pid = candidate.rsplit("-", 1)[1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            orphans.append(candidate)
+    return orphans
+
+
+def adopt_orphan_spools(path: str, own_path: str) -> list:
+    """
+    Ajoute à own_path les lignes des fichiers de secours orphelins et les
+    renvoie. Le renommage préalable garantit qu'un fichier n'est repris que
+    par un seul worker.
+    """
+    adopted = []
+    for orphan in _orphans(path, own_path):
+        claimed = f"{orphan.split('.claimed-')[0]}.claimed-{os.getpid()}"
+        try:
+            os.rename(orphan, claimed)
+        except FileNotFoundError:
+            continue
+        rows = read_lines(claimed)
+        if rows:
+            append_lines(own_path, rows)
+            adopted.extend(rows)
+        os.unlink(claimed)
+    if adopted:
+        logger.info("spool_adopted", path=own_path, rows=len(adopted))
+    return adopted
+
+
+def append_lines(path: str, rows: list):
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_lines(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # Dernière ligne tronquée par un arrêt brutal
+                logger.error("spool_line_corrupt", path=path, line=line[:80])
+    return rows
+
+
+def rewrite_lines(path: str, rows: list):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+# database.py et auth_service.py lisent leur configuration à l'import ; aucune
+# connexion n'est ouverte par les tests
+for key, value in {
+    "port": "3306",
+    "JWT_SECRET": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRE_HOURS": "1",
+    "SMTP_PORT": "25",
+    "LOG_LEVEL": "OFF",
+}.items():
+    os.environ.setdefault(key, value)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import prediction_service
+from services.model_format import ExportedSalaryModel, export_pipeline
+
+SAMPLE = [
+    prediction_service.WARMUP_SAMPLE,
+    {"titre": "Data Scientist", "description": "Machine learning, Python, SQL. Junior accepté.",
+     "metier": "Data Scientist", "region": "Bretagne"},
+    {"titre": "Chef de projet", "description": "", "metier": "inconnu", "region": ""},
+    {"titre": "DevOps", "description": "Kubernetes, Docker, AWS, Terraform. Lead technique, 10 ans.",
+     "metier": "DevOps", "region": "Occitanie"},
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    model_path = prediction_service._get_model_path()
+    if model_path is None:
+        pytest.skip("salary_model_xgboost.pkl absent")
+    with open(model_path, "rb") as f:
+        raw = f.read()
+    return prediction_service._load_pickle(model_path, raw)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rows = []
+    for posting in SAMPLE:
+        competences, level = prediction_service.analyze_posting(posting["titre"], posting["description"])
+        rows.append(prediction_service._build_features(
+            posting["titre"], posting["description"], posting["metier"], posting["region"], level, competences
+        ))
+    return rows
+
+
+def test_lean_predictor_matches_pipeline(pipeline, rows):
+    model = pipeline[0]
+    expected = model.predict(pd.DataFrame(rows))
+    actual = prediction_service._LeanPipeline(model).predict(rows)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_exported_model_matches_pipeline(pipeline, rows, tmp_path):
+    model, version, path = pipeline
+    manifest = export_pipeline(model, str(tmp_path), version, source=path)
+    exported = ExportedSalaryModel(str(tmp_path))
+    assert manifest["version"] == version
+    np.testing.assert_array_equal(exported.predict(pd.DataFrame(rows)), model.predict(pd.DataFrame(rows)))
+
+
+def test_export_refuses_unsupported_tfidf(pipeline, tmp_path):
+    import copy
+    model = copy.deepcopy(pipeline[0])
+    transformers = {name: transformer for name, transformer, _ in model.steps[0][1].transformers_}
+    transformers["txt"].sublinear_tf = True
+    with pytest.raises(ValueError, match="sublinear_tf"):
+        export_pipeline(model, str(tmp_path), "test")
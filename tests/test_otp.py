@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from services import auth_service
+from services.otp_store import InMemoryOTPStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = InMemoryOTPStore()
+    monkeypatch.setattr(auth_service, "otp_store", store)
+    return store
+
+
+def check(code):
+    try:
+        return auth_service._check_otp("reset", "a@b.fr", code, "No reset code found")
+    except HTTPException as error:
+        return error.status_code
+
+
+def test_valid_code(store):
+    store.put("reset", "a@b.fr", "123456", timedelta(minutes=5), user_id=1)
+    assert check("123456")["user_id"] == 1
+
+
+def test_unknown_code_is_400(store):
+    assert check("123456") == 400
+
+
+def test_expired_code_is_removed(store):
+    store.put("reset", "a@b.fr", "123456", timedelta(seconds=-1))
+    assert check("123456") == 400
+    assert store.get("reset", "a@b.fr") is None
+
+
+def test_attempts_exhausted(store):
+    store.put("reset", "a@b.fr", "123456", timedelta(minutes=5))
+    results = [check("000000") for _ in range(auth_service.OTP_MAX_ATTEMPTS)]
+    assert results == [400] * auth_service.OTP_MAX_ATTEMPTS
+    # Le bon code n'est plus accepté une fois les essais épuisés
+    assert check("123456") == 429
+    assert store.get("reset", "a@b.fr") is None
+
+
+def test_non_ascii_code_is_rejected_not_500(store):
+    store.put("reset", "a@b.fr", "123456", timedelta(minutes=5))
+    assert check("12345é") == 400
+
+
+def test_take_attempt_stops_at_limit():
+    store = InMemoryOTPStore()
+    store.put("verify", "a@b.fr", "1", timedelta(minutes=5))
+    assert [store.take_attempt("verify", "a@b.fr", 2) for _ in range(3)] == [True, True, False]
+    assert not store.take_attempt("verify", "missing@b.fr", 2)
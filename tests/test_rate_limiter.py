@@ -0,0 +1,50 @@
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import InMemoryRateLimitBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_starts_full_then_limits(clock):
+    backend = InMemoryRateLimitBackend()
+    results = [backend.take("k", 3, 1.0) for _ in range(4)]
+    assert results[:3] == [(True, 0.0)] * 3
+    allowed, retry_after = results[3]
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_refill_is_proportional_to_elapsed_time(clock):
+    backend = InMemoryRateLimitBackend()
+    for _ in range(10):
+        backend.take("k", 10, 10 / 60)
+    clock[0] += 3
+    # 3 s à 1/6 jeton par seconde : 0,5 jeton, il en manque 0,5 (3 s)
+    allowed, retry_after = backend.take("k", 10, 10 / 60)
+    assert not allowed
+    assert retry_after == pytest.approx(3.0)
+    clock[0] += 3
+    assert backend.take("k", 10, 10 / 60) == (True, 0.0)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    backend = InMemoryRateLimitBackend()
+    backend.take("k", 2, 1.0)
+    clock[0] += 3600
+    assert [backend.take("k", 2, 1.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_are_independent_and_bounded(clock):
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    assert backend.take("a", 1, 1.0)[0]
+    assert not backend.take("a", 1, 1.0)[0]
+    assert backend.take("b", 1, 1.0)[0]
+    # "a" est la clé la moins récente : évincée, son seau repart plein
+    backend.take("c", 1, 1.0)
+    assert backend.take("a", 1, 1.0)[0]
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from services.search_service import _decode_cursor, _encode_cursor, _keyset_condition
+
+
+def test_single_key():
+    assert _keyset_condition([("o.idOffre", [], 42, False)]) == ("(o.idOffre < %s)", [42])
+
+
+def test_nullable_key_then_tiebreaker():
+    sql, params = _keyset_condition([("o.salaire_avg", [], Decimal("50000.00"), True), ("o.idOffre", [], 7, False)])
+    assert sql == "(o.salaire_avg < %s OR o.salaire_avg IS NULL OR (o.salaire_avg = %s AND (o.idOffre < %s)))"
+    assert params == [Decimal("50000.00"), Decimal("50000.00"), 7]
+
+
+def test_null_value_only_continues_among_nulls():
+    sql, params = _keyset_condition([("o.salaire_avg", [], None, True), ("o.idOffre", [], 7, False)])
+    assert sql == "(o.salaire_avg IS NULL AND (o.idOffre < %s))"
+    assert params == [7]
+
+
+def test_null_last_key_ends_the_listing():
+    assert _keyset_condition([("o.idOffre", [], None, False)]) == ("FALSE", [])
+
+
+def test_expression_params_repeated_for_each_use():
+    expr = "MATCH(o.titre, o.description) AGAINST (%s IN BOOLEAN MODE)"
+    sql, params = _keyset_condition([(expr, ["+python*"], 1.5, False), ("o.idOffre", [], 3, False)])
+    assert sql.count("%s") == len(params)
+    assert params == ["+python*", 1.5, "+python*", 1.5, 3]
+
+
+def test_cursor_round_trip_keeps_decimals_exact():
+    values = [Decimal("45000.10"), None, 12]
+    assert _decode_cursor(_encode_cursor(values), 3) == values
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor("not-a-cursor", 2)
+    assert error.value.status_code == 400
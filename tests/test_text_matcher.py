@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from services.prediction_service import KNOWN_COMPETENCES, MATCHER_SCAN_MAX_TERMS, _TextMatcher
+
+EXTRA = ["Lead", "Expert", "machine", "learning", "data", "data science", "science", "c", "c++",
+         "node", "node.js", "go", "golang", "power bi", "bi"]
+FILLER = [f"outil{i}" for i in range(MATCHER_SCAN_MAX_TERMS)]
+
+
+@pytest.fixture(scope="module")
+def matchers():
+    regex = _TextMatcher(KNOWN_COMPETENCES + EXTRA + FILLER)
+    scan = _TextMatcher(KNOWN_COMPETENCES + EXTRA + FILLER)
+    scan._pattern = None
+    assert regex._pattern is not None
+    return regex, scan
+
+
+@pytest.mark.parametrize("flags", [(True, True), (True, False), (False, True)])
+def test_regex_and_scan_paths_agree(matchers, flags):
+    regex, scan = matchers
+    words = [w.lower() for w in EXTRA] + ["machine learning", "senior", "junior", "5 ans", "google",
+                                          "javascript", "python", "(", ")", "/", ","]
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = rng.choice([" ", "/", "-", ""]).join(rng.choice(words) for _ in range(rng.randint(0, 10)))
+        assert regex.scan(text, *flags) == scan.scan(text, *flags), text
+
+
+def test_nested_terms_found(matchers):
+    for matcher in matchers:
+        competences, _ = matcher.scan("Expérience en machine learning")
+        assert {"machine learning", "machine", "learning"} <= competences
+
+
+def test_seniority_word_is_also_a_competence(matchers):
+    for matcher in matchers:
+        competences, level = matcher.scan("Lead developer expert")
+        assert {"lead", "expert"} <= competences
+        assert level == "Senior (5+ ans)"
+
+
+def test_word_boundaries():
+    matcher = _TextMatcher(KNOWN_COMPETENCES)
+    competences, _ = matcher.scan("google javascript")
+    assert "go" not in competences and "java" not in competences
+    assert "javascript" in competences
+
+
+def test_flags_are_honored(matchers):
+    for matcher in matchers:
+        assert matcher.scan("python senior", with_competences=False) == (set(), "Senior (5+ ans)")
+        assert matcher.scan("python senior", with_level=False) == ({"python"}, None)